@@ -0,0 +1,112 @@
+'''
+Time pipeline_functions.get_text against the original implementation,
+which round-tripped each details dict through JSON and classified its
+elements with json_normalize and lxml.html, on every content item in a
+snapshot, or on synthetic content items if none is given.
+
+    cd python && python3 -m benchmarks.details_text --snapshot ../data/content.json.gz
+'''
+import argparse
+import json
+import time
+from collections import OrderedDict
+
+from lxml import html
+from pandas.io.json import json_normalize
+
+import pipeline_functions
+from benchmarks import synthetic
+from data import snapshot
+from pipeline_functions import extract_text, filtered, look, child_keys
+
+parser = argparse.ArgumentParser(description=__doc__)
+
+parser.add_argument(
+    '--snapshot', dest='snapshot', default=None,
+    help='Content snapshot to take the details from, e.g. ../data/content.json.gz'
+)
+
+parser.add_argument(
+    '--items', dest='items', type=int, default=2000,
+    help='Number of synthetic content items, if there is no snapshot'
+)
+
+
+def original_get_text(x):
+    total_text = ""
+    string_json = json.dumps(OrderedDict(x))
+    order_json = json.loads(string_json, object_pairs_hook=OrderedDict)
+    for key, raw_text in sorted(order_json.items()):
+        if key in filtered:
+            if isinstance(raw_text, str) and len(raw_text) > 1:
+                raw_text = raw_text.replace("-", " ")
+                raw_token = raw_text.split(" ")
+                if len(raw_token) > 0:
+                    raw_string = extract_text(raw_text)
+                    total_text += " " + raw_string
+            elif isinstance(raw_text, list) and len(raw_text) > 0:
+                for sub_text in raw_text:
+                    if original_is_json(sub_text):
+                        total_text += original_nested_extract(sub_text)
+                    elif original_is_html(sub_text):
+                        str_from_html = extract_text(sub_text)
+                        total_text += " " + str_from_html
+    return total_text.strip()
+
+
+def original_nested_extract(x):
+    ttext = ""
+    string_json2 = json.dumps(OrderedDict(x))
+    order_json2 = json.loads(string_json2, object_pairs_hook=OrderedDict)
+    if ('body' or 'title') in order_json2.keys():
+        for item in look:
+            raw_string2 = extract_text(order_json2[item])
+            if len(raw_string2.split()) > 1:
+                ttext += " " + raw_string2
+    elif 'child_sections' in order_json2.keys():
+        for child in order_json2['child_sections']:
+            for key in child_keys:
+                ttext += " " + child[key]
+    return ttext
+
+
+def original_is_json(raw_text):
+    try:
+        json_normalize(raw_text).columns.tolist()
+    except AttributeError:
+        return False
+    return True
+
+
+def original_is_html(raw_text):
+    return html.fromstring(str(raw_text)).find('.//*') is not None
+
+
+def timed(function, all_details):
+    started_at = time.monotonic()
+    texts = [function(details) for details in all_details]
+    return texts, time.monotonic() - started_at
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    if args.snapshot:
+        content_items = snapshot.read_items(args.snapshot)
+    else:
+        content_items = synthetic.content_items(args.items)
+
+    # The original fails on the Decimals that ijson returns for
+    # numbers with a fractional part, so these go through JSON first
+    all_details = [
+        json.loads(json.dumps(content_item['details'], default=float))
+        for content_item in content_items if 'details' in content_item
+    ]
+
+    original_texts, original_seconds = timed(original_get_text, all_details)
+    texts, seconds = timed(pipeline_functions.get_text, all_details)
+
+    mismatches = sum(1 for original, text in zip(original_texts, texts) if original != text)
+    print("{} details, {} with different text".format(len(all_details), mismatches))
+    print("original get_text: {:.2f}s, {:,.0f} items/sec".format(original_seconds, len(all_details) / original_seconds))
+    print("         get_text: {:.2f}s, {:,.0f} items/sec".format(seconds, len(all_details) / seconds))
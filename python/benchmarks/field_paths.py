@@ -0,0 +1,73 @@
+'''
+Compare lib.helpers.dig and slice with their compiled equivalents, and
+the content slicers built on them, on synthetic content items.
+
+    cd python && python3 -m benchmarks.field_paths
+'''
+import argparse
+import json
+import os
+import timeit
+
+from benchmarks import synthetic
+from data_extraction import content_export
+from lib.helpers import compile_path, compile_slice, dig, slice
+
+parser = argparse.ArgumentParser(description=__doc__)
+
+parser.add_argument(
+    '--items', dest='items', type=int, default=2000,
+    help='Number of synthetic content items'
+)
+
+parser.add_argument(
+    '--repeat', dest='repeat', type=int, default=5,
+    help='Number of times to time each function, taking the fastest'
+)
+
+config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'data_export_fields.json')
+
+with open(config_path) as json_data_file:
+    configuration = json.load(json_data_file)
+
+
+def uncompiled_content_dict_slicer(content_dict, base_fields=[], taxon_fields=[], ppo_fields=[]):
+    # content_dict_slicer as it was written with dig and slice
+    result = slice(content_dict, base_fields)
+    taxons = dig(content_dict, 'links', 'taxons')
+    ppo = dig(content_dict, 'links', 'primary_publishing_organisation')
+
+    if taxons:
+        result['taxons'] = [slice(taxon, taxon_fields) for taxon in taxons]
+    if ppo:
+        result['primary_publishing_organisation'] = slice(ppo[0], ppo_fields)
+
+    return result
+
+
+def report(name, function, items, repeat):
+    seconds = min(timeit.repeat(lambda: [function(item) for item in items], number=1, repeat=repeat))
+    print("{:>40}: {:,.0f} items/sec".format(name, len(items) / seconds))
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    items = list(synthetic.content_items(args.items))
+
+    logo_path = ('links', 'organisations', 0, 'details', 'logo', 'formatted-title')
+    logo = compile_path(*logo_path)
+    report('dig logo', lambda item: dig(item, *logo_path), items, args.repeat)
+    report('compile_path logo', logo, items, args.repeat)
+
+    base_fields = configuration['base_fields']
+    base_slicer = compile_slice(base_fields)
+    report('slice base_fields', lambda item: slice(item, base_fields), items, args.repeat)
+    report('compile_slice base_fields', base_slicer, items, args.repeat)
+
+    fields = {
+        'base_fields': configuration['base_fields'],
+        'taxon_fields': configuration['taxon_fields'],
+        'ppo_fields': configuration['ppo_fields'],
+    }
+    report('dig and slice content slicer', lambda item: uncompiled_content_dict_slicer(item, **fields), items, args.repeat)
+    report('compile_content_dict_slicer', content_export.compile_content_dict_slicer(**fields), items, args.repeat)
@@ -0,0 +1,98 @@
+'''
+Compare lib.html_text.extract_text with the original implementation of
+pipeline_functions.extract_text, on the titles, descriptions and
+details of content items. These come from a content snapshot if one is
+given, otherwise they're synthetic.
+
+    cd python && python3 -m benchmarks.html_text --snapshot ../data/content.json.gz
+'''
+import argparse
+import itertools
+import timeit
+
+from lxml import etree
+
+from benchmarks import synthetic
+from data import snapshot
+from lib import html_text
+
+parser = argparse.ArgumentParser(description=__doc__)
+
+parser.add_argument(
+    '--snapshot', dest='snapshot', default=None,
+    help='Content snapshot to take the text from, e.g. ../data/content.json.gz'
+)
+
+parser.add_argument(
+    '--items', dest='items', type=int, default=2000,
+    help='Number of content items to take the text from'
+)
+
+parser.add_argument(
+    '--repeat', dest='repeat', type=int, default=3,
+    help='Number of times to time each function, taking the fastest'
+)
+
+
+def original_extract_text(body):
+    r = None
+    if body and body!="\n":
+        try:
+            tree = etree.HTML(body)
+            r = tree.xpath('//text()')
+            r = ' '.join(r)
+            r = r.strip().replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
+            r = r.replace('\n', ' ').replace(',', ' ')
+            r = r.lower()
+            r = ' '.join(r.split())
+        except ValueError:
+            pass
+    if not r:
+        r = ' '
+    return r
+
+
+def strings(value):
+    # All of the non-blank strings in a content item's details
+    if isinstance(value, str):
+        if value.strip():
+            yield value
+    elif isinstance(value, dict):
+        for child in value.values():
+            yield from strings(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from strings(child)
+
+
+def texts(content_items):
+    for content_item in content_items:
+        yield from strings(content_item.get('title'))
+        yield from strings(content_item.get('description'))
+        yield from strings(content_item.get('details'))
+
+
+def report(name, function, texts, repeat):
+    seconds = min(timeit.repeat(lambda: [function(text) for text in texts], number=1, repeat=repeat))
+    print("{:>24}: {:,.0f} strings/sec, {:,.1f} MB/sec".format(
+        name,
+        len(texts) / seconds,
+        sum(len(text) for text in texts) / seconds / 1e6
+    ))
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    if args.snapshot:
+        content_items = itertools.islice(snapshot.read_items(args.snapshot), args.items)
+    else:
+        content_items = synthetic.content_items(args.items)
+
+    all_texts = list(texts(content_items))
+
+    mismatches = [text for text in all_texts if html_text.extract_text(text) != original_extract_text(text)]
+    print("{} strings, {} with different output".format(len(all_texts), len(mismatches)))
+
+    report('original', original_extract_text, all_texts, args.repeat)
+    report('html_text', html_text.extract_text, all_texts, args.repeat)
@@ -0,0 +1,87 @@
+'''
+Time one-hot encoding titles with tokenizing.BinaryMatrixEncoder
+against Keras' texts_to_matrix wrapped in csr_matrix, which dataprep
+used before, and compare the peak memory each allocates. Keras is only
+timed if it is installed.
+
+    cd python && python3 -m benchmarks.one_hot_matrix --texts 20000
+'''
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from scipy import sparse
+
+import tokenizing
+from benchmarks.synthetic import WORDS
+
+parser = argparse.ArgumentParser(description=__doc__)
+
+parser.add_argument(
+    '--texts', dest='texts', type=int, default=20000,
+    help='Number of synthetic titles to encode'
+)
+
+parser.add_argument(
+    '--dtype', dest='dtype', default='float64',
+    help='dtype of the BinaryMatrixEncoder matrix, e.g. uint8 or float32'
+)
+
+
+def synthetic_title(rng):
+    return ' '.join(
+        '{}{}'.format(rng.choice(WORDS), int(rng.paretovariate(0.5)) % 20000)
+        for _ in range(rng.randint(3, 15))
+    )
+
+
+def keras_one_hot_matrix(tokenizer_filename, texts):
+    tokenizer = tokenizing.load_tokenizer_from_file(tokenizer_filename)
+    tokenizer.num_words = 10000
+    return sparse.csr_matrix(tokenizer.texts_to_matrix(texts))
+
+
+def encoder_one_hot_matrix(tokenizer_filename, texts, dtype):
+    encoder = tokenizing.BinaryMatrixEncoder(tokenizing.load_word_index(tokenizer_filename), num_words=10000, dtype=dtype)
+    return encoder.encode(texts)
+
+
+def measured(function, *args):
+    # The time taken, and the peak memory allocated while it ran
+    tracemalloc.start()
+    started_at = time.monotonic()
+    result = function(*args)
+    seconds = time.monotonic() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts = [synthetic_title(rng) for _ in range(args.texts)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        tokenizer_filename = os.path.join(directory, 'title_tokenizer.json')
+        tokenizing.TokenizerStatistics().add_all(texts).save(
+            10000, tokenizer_filename, tokenizing.vocabulary_filename(tokenizer_filename)
+        )
+
+        matrix, seconds, peak = measured(encoder_one_hot_matrix, tokenizer_filename, texts, args.dtype)
+        print("BinaryMatrixEncoder: {:.2f}s, {:,.0f}MB peak, {:,} ones".format(seconds, peak / 2 ** 20, matrix.nnz))
+
+        try:
+            keras_matrix, keras_seconds, keras_peak = measured(keras_one_hot_matrix, tokenizer_filename, texts)
+        except ImportError:
+            print("Keras isn't installed, so isn't timed")
+        else:
+            print("              Keras: {:.2f}s, {:,.0f}MB peak, {} matrix".format(
+                keras_seconds,
+                keras_peak / 2 ** 20,
+                'same' if (matrix.astype(keras_matrix.dtype) != keras_matrix).nnz == 0 else 'different'
+            ))
@@ -0,0 +1,96 @@
+'''
+Time converting combined text to padded sequences with
+tokenizing.SequenceEncoder against Keras' texts_to_sequences and
+pad_sequences, which dataprep used before. Keras is only timed if it
+is installed.
+
+The tokenizer is fitted on synthetic texts, with a long tailed
+vocabulary, unless a combined_text_tokenizer.json is given.
+
+    cd python && python3 -m benchmarks.padded_sequences --workers 4
+'''
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+import tokenizing
+from benchmarks.synthetic import WORDS
+
+parser = argparse.ArgumentParser(description=__doc__)
+
+parser.add_argument(
+    '--tokenizer', dest='tokenizer', default=None,
+    help='Tokenizer file to take the vocabulary from, e.g. ../data/combined_text_tokenizer.json'
+)
+
+parser.add_argument(
+    '--texts', dest='texts', type=int, default=5000,
+    help='Number of synthetic texts to convert'
+)
+
+parser.add_argument(
+    '--workers', dest='workers', type=int, default=1,
+    help='Number of processes SequenceEncoder converts the texts on'
+)
+
+
+def synthetic_text(rng):
+    # Word frequencies roughly follow Zipf's law, as in real text, and
+    # so do the lengths of the texts, with a few very long ones
+    return ' '.join(
+        '{}{}'.format(rng.choice(WORDS), int(rng.paretovariate(0.5)) % 50000)
+        for _ in range(min(int(100 * rng.paretovariate(1.2)), 20000))
+    )
+
+
+def keras_padded_sequences(tokenizer_filename, texts):
+    from keras.preprocessing.sequence import pad_sequences
+
+    tokenizer = tokenizing.load_tokenizer_from_file(tokenizer_filename)
+    tokenizer.num_words = 20000
+    return pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=1000, padding='post', truncating='post')
+
+
+def encoder_padded_sequences(tokenizer_filename, texts, workers):
+    encoder = tokenizing.SequenceEncoder(tokenizing.load_word_index(tokenizer_filename), num_words=20000, maxlen=1000)
+    return encoder.encode(texts, workers=workers)
+
+
+def timed(function, *args):
+    started_at = time.monotonic()
+    result = function(*args)
+    return result, time.monotonic() - started_at
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts = [synthetic_text(rng) for _ in range(args.texts)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        tokenizer_filename = args.tokenizer
+
+        if tokenizer_filename is None:
+            tokenizer_filename = os.path.join(directory, 'combined_text_tokenizer.json')
+            tokenizing.create_and_save_tokenizer(texts, 20000, tokenizer_filename)
+
+        sequences, seconds = timed(encoder_padded_sequences, tokenizer_filename, texts, args.workers)
+        print("SequenceEncoder ({} workers): {:.2f}s, {:,.0f} texts/sec".format(
+            args.workers, seconds, len(texts) / seconds
+        ))
+
+        try:
+            keras_sequences, keras_seconds = timed(keras_padded_sequences, tokenizer_filename, texts)
+        except ImportError:
+            print("Keras isn't installed, so isn't timed")
+        else:
+            print("          Keras: {:.2f}s, {:,.0f} texts/sec, {} output".format(
+                keras_seconds,
+                len(texts) / keras_seconds,
+                'same' if np.array_equal(sequences, keras_sequences) else 'different'
+            ))
@@ -0,0 +1,60 @@
+'''
+Measure how quickly content snapshots are parsed, in items/sec, for
+each available ijson backend and snapshot format.
+
+    cd python && python3 -m benchmarks.snapshot_parsing --items 5000
+'''
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks import synthetic
+from data import snapshot
+
+parser = argparse.ArgumentParser(description=__doc__)
+
+parser.add_argument(
+    '--items', dest='items', type=int, default=5000,
+    help='Number of synthetic content items in the snapshot'
+)
+
+
+def items_per_second(filename, **kwargs):
+    started_at = time.monotonic()
+    count = sum(1 for _ in snapshot.read_items(filename, **kwargs))
+    return count / (time.monotonic() - started_at)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_filename = os.path.join(tmpdir, 'content.json.gz')
+        json_lines_filename = os.path.join(tmpdir, 'content.jsonl.gz')
+
+        snapshot.write_items(json_filename, synthetic.content_items(args.items))
+        snapshot.write_items(json_lines_filename, synthetic.content_items(args.items))
+
+        print("Default ijson backend: {}".format(snapshot.ijson_backend()[0]))
+
+        for backend in snapshot.IJSON_BACKENDS:
+            try:
+                snapshot.ijson_backend((backend,))
+            except ImportError:
+                print("{:>24}: not available".format('ijson ' + backend))
+                continue
+
+            print("{:>24}: {:,.0f} items/sec".format(
+                'ijson ' + backend,
+                items_per_second(json_filename, backends=(backend,))
+            ))
+
+        for decoder in ('orjson', 'ujson', 'json'):
+            try:
+                rate = items_per_second(json_lines_filename, decoder=decoder)
+            except ImportError:
+                print("{:>24}: not available".format('JSON Lines ' + decoder))
+                continue
+
+            print("{:>24}: {:,.0f} items/sec".format('JSON Lines ' + decoder, rate))
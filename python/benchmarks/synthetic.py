@@ -0,0 +1,86 @@
+'''
+Synthetic GOV.UK content items, shaped like those in content.json.gz,
+for benchmarking the pipeline without downloading the content store.
+'''
+import random
+import uuid
+
+WORDS = (
+    'apply benefit business childcare council driving education '
+    'employment funding guidance housing immigration licence '
+    'passport pension register school tax transport visa welfare'
+).split()
+
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length)).capitalize()
+
+
+def html_body(rng, paragraphs):
+    return '\n'.join(
+        '<h2 id="section-{i}">{heading}</h2>\n<p>{text}, <a href="/guidance/{i}">{link}</a>.</p>'.format(
+            i=i,
+            heading=sentence(rng, 4),
+            text=sentence(rng, 40),
+            link=sentence(rng, 3),
+        )
+        for i in range(paragraphs)
+    )
+
+
+def taxon(rng, depth):
+    taxon_dict = {
+        'base_path': '/{}'.format('/'.join(rng.choice(WORDS) for _ in range(depth))),
+        'content_id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'title': sentence(rng, 3),
+        'phase': 'live',
+        'links': {},
+    }
+
+    if depth > 1:
+        taxon_dict['links']['parent_taxons'] = [taxon(rng, depth - 1)]
+    else:
+        taxon_dict['links']['root_taxon'] = [{'base_path': '/', 'content_id': 'f3bbdec2-0e62-4520-a7fd-6ffd5d36e03a'}]
+
+    return taxon_dict
+
+
+def content_item(rng):
+    return {
+        'base_path': '/guidance/{}'.format('-'.join(rng.choice(WORDS) for _ in range(5))),
+        'content_id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'description': sentence(rng, 20),
+        'details': {
+            'body': html_body(rng, rng.randint(2, 20)),
+            'parts': [
+                {'title': sentence(rng, 4), 'slug': 'part-{}'.format(i), 'body': html_body(rng, 3)}
+                for i in range(rng.randint(0, 3))
+            ],
+            'political': False,
+        },
+        'document_type': rng.choice(['guide', 'detailed_guide', 'news_story', 'answer']),
+        'first_published_at': '2017-0{}-1{}T09:30:00.000+00:00'.format(rng.randint(1, 9), rng.randint(0, 9)),
+        'locale': 'en',
+        'publishing_app': rng.choice(['publisher', 'whitehall', 'specialist-publisher']),
+        'title': sentence(rng, 6),
+        'updated_at': '2018-02-01T10:00:00.000+00:00',
+        'links': {
+            'taxons': [taxon(rng, rng.randint(1, 4)) for _ in range(rng.randint(0, 3))],
+            'primary_publishing_organisation': [
+                {'title': sentence(rng, 3), 'content_id': str(uuid.UUID(int=rng.getrandbits(128)))}
+            ],
+            'organisations': [
+                {
+                    'title': sentence(rng, 3),
+                    'content_id': str(uuid.UUID(int=rng.getrandbits(128))),
+                    'details': {'logo': {'formatted-title': sentence(rng, 3)}},
+                }
+            ],
+        },
+    }
+
+
+def content_items(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield content_item(rng)
@@ -0,0 +1,79 @@
+'''
+Time loading a tokenizer's word_index from its JSON file, which holds
+the word and document counts of every word seen too, against the
+vocabulary file written next to it.
+
+The tokenizer is fitted on synthetic texts unless a tokenizer file,
+with its vocabulary file, is given.
+
+    cd python && python3 -m benchmarks.tokenizer_loading --tokenizer ../data/combined_text_tokenizer.json
+'''
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import tokenizing
+from benchmarks.padded_sequences import synthetic_text
+
+parser = argparse.ArgumentParser(description=__doc__)
+
+parser.add_argument(
+    '--tokenizer', dest='tokenizer', default=None,
+    help='Tokenizer file to load, e.g. ../data/combined_text_tokenizer.json'
+)
+
+parser.add_argument(
+    '--texts', dest='texts', type=int, default=5000,
+    help='Number of synthetic texts to fit the tokenizer on'
+)
+
+
+def load_json_word_index(filename):
+    with open(filename, 'r') as infile:
+        return json.load(infile)['word_index']
+
+
+def timed(function, *args, repeat=5):
+    # The best of several runs, as the file is cached after the first
+    times = []
+    for _ in range(repeat):
+        started_at = time.monotonic()
+        result = function(*args)
+        times.append(time.monotonic() - started_at)
+    return result, min(times)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        tokenizer_filename = args.tokenizer
+
+        if tokenizer_filename is None:
+            rng = random.Random(0)
+            tokenizer_filename = os.path.join(directory, 'combined_text_tokenizer.json')
+            tokenizing.TokenizerStatistics().add_all(synthetic_text(rng) for _ in range(args.texts)).save(
+                20000, tokenizer_filename, tokenizing.vocabulary_filename(tokenizer_filename)
+            )
+
+        vocabulary_filename = tokenizing.vocabulary_filename(tokenizer_filename)
+        word_index, json_seconds = timed(load_json_word_index, tokenizer_filename)
+        vocabulary, open_seconds = timed(tokenizing.Vocabulary, vocabulary_filename)
+        vocabulary_dict, dict_seconds = timed(vocabulary.to_dict)
+
+        words = list(word_index)[:1000]
+        _, lookup_seconds = timed(lambda: [vocabulary[word] for word in words])
+
+        print("{:,} byte tokenizer, {:,} byte vocabulary, {:,} words, {}".format(
+            os.path.getsize(tokenizer_filename),
+            os.path.getsize(vocabulary_filename),
+            len(word_index),
+            'same' if vocabulary_dict == word_index else 'different'
+        ))
+        print("         JSON word_index: {:.4f}s".format(json_seconds))
+        print("       Vocabulary opened: {:.4f}s".format(open_seconds))
+        print("    Vocabulary as a dict: {:.4f}s".format(dict_seconds))
+        print("1,000 Vocabulary lookups: {:.4f}s".format(lookup_seconds))
@@ -6,12 +6,14 @@ import os
 import csv
 import logging.config
 from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 
 from data_extraction.export_data import jenkins_compatible_progress_bar
+from lib.concurrency import imap_ordered
 from pipeline_functions import extract_text, get_primary_publishing_org, get_text, map_content_id_to_taxon_id
-from tokenizing import create_and_save_tokenizer
+from tokenizing import TokenizerStatistics
 import yaml
-from data import *
+from data import snapshot
 
 # Setup pipeline logging
 
@@ -28,6 +30,10 @@ OUTPUT_TEXT_TOKENIZER = os.path.join(DATADIR, 'combined_text_tokenizer.json.temp
 OUTPUT_TITLE_TOKENIZER = os.path.join(DATADIR, 'title_tokenizer.json.temp')
 OUTPUT_DESCRIPTION_TOKENIZER = os.path.join(DATADIR, 'description_tokenizer.json.temp')
 
+OUTPUT_TEXT_VOCABULARY = os.path.join(DATADIR, 'combined_text_tokenizer.vocab.temp')
+OUTPUT_TITLE_VOCABULARY = os.path.join(DATADIR, 'title_tokenizer.vocab.temp')
+OUTPUT_DESCRIPTION_VOCABULARY = os.path.join(DATADIR, 'description_tokenizer.vocab.temp')
+
 OUTPUT_METADATA_LISTS = os.path.join(DATADIR, 'metadata_lists.yaml.temp')
 
 
@@ -38,6 +44,11 @@ class Metadata:
         self.primary_publishing_organisations = set()
         self.publishing_apps = set()
 
+    def merge(self, other):
+        self.document_types.update(other.document_types)
+        self.primary_publishing_organisations.update(other.primary_publishing_organisations)
+        self.publishing_apps.update(other.publishing_apps)
+
     def write(self):
         logger.info('saving metadata lists')
 
@@ -50,31 +61,44 @@ class Metadata:
 
 
 class TextData:
+    # Tokenizer statistics for the cleaned content, added to as each
+    # item is written, so the texts themselves aren't kept
     def __init__(self):
-        self.titles = []
-        self.descriptions = []
-        self.combined_texts = []
+        self.titles = TokenizerStatistics()
+        self.descriptions = TokenizerStatistics()
+        self.combined_texts = TokenizerStatistics()
+
+    def add(self, clean_row):
+        self.combined_texts.add(clean_row['combined_text'])
+        self.titles.add(clean_row['title'])
+        self.descriptions.add(clean_row['description'])
+
+    def merge(self, other):
+        # other must be for the rows written after those in self
+        self.combined_texts.merge(other.combined_texts)
+        self.titles.merge(other.titles)
+        self.descriptions.merge(other.descriptions)
 
     def tokenize_and_save(self):
         logger.info('tokenizing texts')
-        create_and_save_tokenizer(
-            self.combined_texts,
+        self.combined_texts.save(
             num_words=20000,
-            outfilename=OUTPUT_TEXT_TOKENIZER
+            outfilename=OUTPUT_TEXT_TOKENIZER,
+            vocabulary_outfilename=OUTPUT_TEXT_VOCABULARY
         )
 
         logger.info('tokenizing title')
-        create_and_save_tokenizer(
-            self.titles,
+        self.titles.save(
             num_words=10000,
-            outfilename=OUTPUT_TITLE_TOKENIZER
+            outfilename=OUTPUT_TITLE_TOKENIZER,
+            vocabulary_outfilename=OUTPUT_TITLE_VOCABULARY
         )
 
         logger.info('tokenizing description')
-        create_and_save_tokenizer(
-            self.descriptions,
+        self.descriptions.save(
             num_words=10000,
-            outfilename=OUTPUT_DESCRIPTION_TOKENIZER
+            outfilename=OUTPUT_DESCRIPTION_TOKENIZER,
+            vocabulary_outfilename=OUTPUT_DESCRIPTION_VOCABULARY
         )
 
 
@@ -94,16 +118,20 @@ HEADER_LIST = [
 ]
 
 
-def process_content_item(content_item, clean_content_writer, content_to_taxon_map_writer, metadata, textdata):
+def clean_content_item(content_item, metadata):
+    # The part of processing a content item that doesn't write
+    # anything, so it can run in a worker process. Returns the clean
+    # content row, as a dict, and the content_id, taxon_id pairs, or
+    # None for out-of-scope items. metadata is updated with the item.
     if content_item['locale'] != 'en':
-        return
+        return None
 
     if content_item['document_type'] in (
         'worldwide_organisation',
         'placeholder_world_location_news_page',
         'travel_advice'
     ):
-        return # out-of-scope items
+        return None # out-of-scope items
 
     content_item['title'] = extract_text(content_item["title"])
     content_item['description'] = extract_text(content_item["description"])
@@ -116,20 +144,65 @@ def process_content_item(content_item, clean_content_writer, content_to_taxon_ma
         content_item['primary_publishing_organisation'] = primary_publishing_organisation['title']
         metadata.primary_publishing_organisations.add(primary_publishing_organisation['title'])
 
+    metadata.document_types.add(content_item['document_type'])
+    metadata.publishing_apps.add(content_item['publishing_app'])
+
+    clean_row = {x: content_item.get(x) for x in HEADER_LIST}
+
+    return clean_row, map_content_id_to_taxon_id(content_item)
+
+
+def clean_content_items(content_items):
+    # Cleans a chunk of content items, returning the results of
+    # clean_content_item for those in scope, and the Metadata and
+    # TextData of the chunk, to be merged with the others in order
+    metadata = Metadata()
+    textdata = TextData()
+    results = []
+
+    for content_item in content_items:
+        try:
+            result = clean_content_item(content_item, metadata)
+        except Exception as e:
+            print(content_item)
+            print(e)
+            raise
+
+        if result is not None:
+            results.append(result)
+            textdata.add(result[0])
+
+    return results, metadata, textdata
+
+
+def write_clean_row(clean_row, content_to_taxon_map, clean_content_writer, content_to_taxon_map_writer):
     # Get content_id, taxon_id pairs and write to csv
-    content_to_taxon_map_writer.writerows(map_content_id_to_taxon_id(content_item))
+    content_to_taxon_map_writer.writerows(content_to_taxon_map)
 
-    clean_content_writer.writerow([content_item.get(x) for x in HEADER_LIST])
+    clean_content_writer.writerow([clean_row[x] for x in HEADER_LIST])
+
+
+def process_content_item(content_item, clean_content_writer, content_to_taxon_map_writer, metadata, textdata):
+    result = clean_content_item(content_item, metadata)
+
+    if result is not None:
+        clean_row, content_to_taxon_map = result
+        write_clean_row(clean_row, content_to_taxon_map, clean_content_writer, content_to_taxon_map_writer)
+        textdata.add(clean_row)
 
-    metadata.document_types.add(content_item['document_type'])
-    metadata.publishing_apps.add(content_item['publishing_app'])
 
-    textdata.combined_texts.append(content_item['combined_text'])
-    textdata.titles.append(content_item['title'])
-    textdata.descriptions.append(content_item['description'])
+def clean_content_part(part_filename):
+    return clean_content_items(snapshot.read_items(part_filename))
 
 
-def clean_content():
+def clean_content(workers=1, chunk_size=100, filename="content.json.gz"):
+    # With more than one worker, content items are cleaned on a pool
+    # of processes, chunk_size at a time, and written in their
+    # original order. If the snapshot is sharded (content.manifest.json)
+    # each worker reads whole parts, so the parsing is spread across
+    # the processes too.
+    full_filename = os.path.join(DATADIR, filename)
+
     with open(OUTPUT_CLEAN_CONTENT, 'w') as f:
         clean_content_writer = csv.writer(f)
         clean_content_writer.writerow(HEADER_LIST)
@@ -142,22 +215,46 @@ def clean_content():
             metadata = Metadata()
             progress_bar = jenkins_compatible_progress_bar()
 
-            for content_item in progress_bar(items_from_content_file()):
-
-                try:
-                    process_content_item(
-                        content_item,
-                        clean_content_writer,
-                        content_to_taxon_map_writer,
-                        metadata,
-                        textdata
+            if workers > 1 and snapshot.is_manifest(full_filename):
+                cleaned_chunks = imap_ordered(
+                    clean_content_part,
+                    progress_bar(snapshot.read_manifest(full_filename)),
+                    concurrency=workers,
+                    executor_class=ProcessPoolExecutor
+                )
+            else:
+                chunks = __chunks(progress_bar(snapshot.read_items(full_filename)), chunk_size)
+
+                if workers > 1:
+                    cleaned_chunks = imap_ordered(
+                        clean_content_items,
+                        chunks,
+                        concurrency=workers,
+                        max_in_flight=workers * 4,
+                        executor_class=ProcessPoolExecutor
                     )
-
-                except Exception as e:
-                    print(content_item)
-                    print(e)
-                    exit(1)
-
+                else:
+                    cleaned_chunks = map(clean_content_items, chunks)
+
+            try:
+                for results, chunk_metadata, chunk_textdata in cleaned_chunks:
+                    metadata.merge(chunk_metadata)
+                    textdata.merge(chunk_textdata)
+
+                    for clean_row, content_to_taxon_map in results:
+                        write_clean_row(
+                            clean_row,
+                            content_to_taxon_map,
+                            clean_content_writer,
+                            content_to_taxon_map_writer
+                        )
+
+            except Exception:
+                # clean_content_items prints the content item that
+                # failed, if it was one, but this also covers reading
+                # the snapshot, the worker processes and writing rows
+                logger.exception('Cleaning %s failed', full_filename)
+                exit(1)
 
     metadata.write()
     textdata.tokenize_and_save()
@@ -168,12 +265,28 @@ def clean_content():
             OUTPUT_TEXT_TOKENIZER,
             OUTPUT_TITLE_TOKENIZER,
             OUTPUT_DESCRIPTION_TOKENIZER,
+            OUTPUT_TEXT_VOCABULARY,
+            OUTPUT_TITLE_VOCABULARY,
+            OUTPUT_DESCRIPTION_VOCABULARY,
             OUTPUT_METADATA_LISTS
     ):
         os.rename(filename, os.path.splitext(filename)[0])
 
+# PRIVATE
+
+def __chunks(iterator, chunk_size):
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
 if __name__ == '__main__':
-    clean_content()
+    clean_content(
+        workers=int(os.getenv('CLEAN_CONTENT_WORKERS') or 1),
+        filename=os.getenv('CLEAN_CONTENT_FILENAME') or 'content.json.gz'
+    )
 
 
 
@@ -4,6 +4,7 @@ Extract taxon hierarchy from data/taxons.json
 '''
 
 import os
+import sys
 import argparse
 import pathlib
 import logging
@@ -24,6 +25,35 @@ DATADIR = os.getenv('DATADIR')
 
 TAXONS_INPUT_PATH = os.path.join(DATADIR, 'taxons.json.gz')
 TAXONS_OUTPUT_PATH = os.path.join(DATADIR, 'clean_taxons.csv.gz')
+TAXON_LEVELS_INPUT_PATH = os.path.join(DATADIR, 'taxon_levels.csv.gz')
+
+# export_taxons writes out the taxon levels table as it crawls the
+# taxonomy, so if it's there, there's no need to derive it from the
+# parent_content_ids in taxons.json.gz. A table older than
+# taxons.json.gz is from an earlier export, so is ignored.
+
+def taxon_levels_are_current():
+    if not os.path.exists(TAXON_LEVELS_INPUT_PATH):
+        return False
+
+    if os.path.getmtime(TAXON_LEVELS_INPUT_PATH) < os.path.getmtime(TAXONS_INPUT_PATH):
+        logger.warning('Ignoring %s, as it is older than %s', TAXON_LEVELS_INPUT_PATH, TAXONS_INPUT_PATH)
+        return False
+
+    return True
+
+
+if taxon_levels_are_current():
+    logger.info('Importing taxon levels from %s', TAXON_LEVELS_INPUT_PATH)
+
+    df_taxons = pd.read_csv(
+        TAXON_LEVELS_INPUT_PATH,
+        dtype=object,
+        compression='gzip'
+    )
+
+    write_csv(df_taxons, 'Taxons', TAXONS_OUTPUT_PATH, logger)
+    sys.exit(0)
 
 
 # Convert to uri to satisfy pd.read_json
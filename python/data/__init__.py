@@ -1,9 +1,7 @@
 import os
 import yaml
-import gzip
-import ijson
 
-from data.json import stream_json
+from data import snapshot
 
 document_types_excluded_from_the_topic_taxonomy_filename = \
     os.path.join(os.path.abspath(os.path.dirname(__file__)),
@@ -23,15 +21,25 @@ def items_from_content_file(datadir=None, filename="content.json.gz"):
 
     full_filename = os.path.join(datadir, filename)
 
-    with gzip.open(full_filename, mode='rt') as content_file:
-        yield from ijson.items(content_file, prefix='item')
+    # content.jsonl.gz (JSON Lines) snapshots are read line by line
+    yield from snapshot.read_items(full_filename)
 
-def write_content_file(filename, content, datadir=None):
+def map_items(function, datadir=None, filename="content.json.gz", workers=None):
+    # Applies function to every content item on a pool of processes,
+    # see data.snapshot.map_items. Use a sharded snapshot
+    # (content.manifest.json) to parse the file in parallel too.
     if datadir is None:
         datadir = os.getenv("DATADIR") or "data"
 
     full_filename = os.path.join(datadir, filename)
 
-    with gzip.open(full_filename, 'wt') as output_file:
-        stream_json(output_file, content)
+    yield from snapshot.map_items(function, full_filename, workers=workers)
+
+def write_content_file(filename, content, datadir=None, **json_options):
+    if datadir is None:
+        datadir = os.getenv("DATADIR") or "data"
+
+    full_filename = os.path.join(datadir, filename)
+
+    snapshot.write_items(full_filename, content, **json_options)
 
@@ -0,0 +1,87 @@
+from itertools import islice
+
+from data.json import json_encoder, json_decoder
+
+# Columnar content snapshots, written as Parquet with typed columns so
+# that later stages can load just the columns they need without
+# parsing JSON. pyarrow is optional, and only needed for these.
+#
+# Each of the sliced fields is a string column, the taxons are a list
+# of structs, and the primary publishing organisation is a struct.
+# Fields holding arbitrary nested objects, like details, don't have a
+# fixed shape, so are stored as JSON text and decoded when read.
+
+JSON_FIELDS = ('details', 'withdrawn_notice')
+
+
+def content_schema(base_fields, taxon_fields=(), ppo_fields=(), extra_fields=()):
+    import pyarrow as pa
+
+    fields = [pa.field(name, pa.string()) for name in base_fields]
+    fields += [pa.field(name, pa.string()) for name in extra_fields]
+
+    if taxon_fields:
+        fields.append(pa.field('taxons', pa.list_(__struct(taxon_fields))))
+    if ppo_fields:
+        fields.append(pa.field('primary_publishing_organisation', __struct(ppo_fields)))
+
+    return pa.schema(fields)
+
+
+def write_items(filename, iterator, schema, batch_size=10000, encoder='auto'):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    encode = json_encoder(encoder)
+    iterator = iter(iterator)
+
+    with pq.ParquetWriter(filename, schema) as writer:
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                break
+
+            columns = [
+                pa.array(__column(batch, field.name, encode), type=field.type)
+                for field in schema
+            ]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+
+def read_items(filename, decoder='auto', batch_size=10000):
+    # Yields dicts like those the columnar file was written from.
+    # Missing values are left out, rather than set to None.
+    import pyarrow.parquet as pq
+
+    decode = json_decoder(decoder)
+
+    for batch in pq.ParquetFile(filename).iter_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            item = {key: value for key, value in row.items() if value is not None}
+            for name in JSON_FIELDS:
+                if name in item:
+                    item[name] = decode(item[name])
+            yield item
+
+
+def read_columns(filename, columns=None):
+    # Loads the given columns into a pandas DataFrame
+    import pyarrow.parquet as pq
+
+    return pq.read_table(filename, columns=columns).to_pandas()
+
+# PRIVATE
+
+def __struct(field_names):
+    import pyarrow as pa
+
+    return pa.struct([pa.field(name, pa.string()) for name in field_names])
+
+
+def __column(batch, name, encode):
+    values = [item.get(name) for item in batch]
+
+    if name in JSON_FIELDS:
+        return [None if value is None else encode(value) for value in values]
+
+    return values
@@ -1,6 +1,15 @@
+import decimal
 import json
 
-def stream_json(output_file, iterator):
+def stream_json(output_file,
+                iterator,
+                compact=False,
+                sort_keys=True,
+                encoder='json',
+                chunk_size=1000):
+    if compact:
+        return __stream_compact_json(output_file, iterator, sort_keys, encoder, chunk_size)
+
     # The json package in the stdlib doesn't support dumping a
     # generator, but it can handle lists, so this class acts as a
     # go between, making the generator look like a list.
@@ -18,5 +27,107 @@ def stream_json(output_file, iterator):
         output_file,
         indent=4,
         check_circular=False,
-        sort_keys=True,
+        sort_keys=sort_keys,
     )
+
+def json_encoder(name='json', sort_keys=False):
+    # Returns a function encoding an object to a compact JSON
+    # string. 'auto' picks the fastest encoder that's installed.
+    if name == 'auto':
+        for candidate in ('orjson', 'ujson'):
+            try:
+                return json_encoder(candidate, sort_keys=sort_keys)
+            except ImportError:
+                pass
+        name = 'json'
+
+    if name == 'orjson':
+        import orjson
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        return lambda obj: orjson.dumps(obj, default=__default, option=option).decode('utf-8')
+
+    if name == 'ujson':
+        import ujson
+        return lambda obj: ujson.dumps(obj, sort_keys=sort_keys, escape_forward_slashes=False)
+
+    if name == 'json':
+        return json.JSONEncoder(
+            separators=(',', ':'),
+            check_circular=False,
+            sort_keys=sort_keys,
+            default=__default,
+        ).encode
+
+    raise ValueError("Unknown JSON encoder {}".format(name))
+
+def stream_json_lines(output_file,
+                      iterator,
+                      sort_keys=False,
+                      encoder='auto',
+                      chunk_size=1000):
+    # Writes one item per line (http://jsonlines.org/), so the output
+    # can be read, and split, line by line.
+    encode = json_encoder(encoder, sort_keys=sort_keys)
+    chunk = []
+
+    for item in iterator:
+        chunk.append(encode(item))
+        if len(chunk) >= chunk_size:
+            output_file.write('\n'.join(chunk) + '\n')
+            chunk = []
+
+    if chunk:
+        output_file.write('\n'.join(chunk) + '\n')
+
+def json_decoder(name='json'):
+    # Returns a function decoding a JSON string. 'auto' picks the
+    # fastest decoder that's installed.
+    if name == 'auto':
+        for candidate in ('orjson', 'ujson'):
+            try:
+                return json_decoder(candidate)
+            except ImportError:
+                pass
+        name = 'json'
+
+    if name == 'orjson':
+        import orjson
+        return orjson.loads
+
+    if name == 'ujson':
+        import ujson
+        return ujson.loads
+
+    if name == 'json':
+        return json.loads
+
+    raise ValueError("Unknown JSON decoder {}".format(name))
+
+# PRIVATE
+
+def __default(obj):
+    # ijson parses numbers with a fractional part into Decimals
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError("{} is not JSON serializable".format(type(obj)))
+
+def __stream_compact_json(output_file, iterator, sort_keys, encoder, chunk_size):
+    # Writes a JSON array with each item on its own line, encoding
+    # chunk_size items at a time to cut down on writes to the
+    # (usually gzipped) output file.
+    encode = json_encoder(encoder, sort_keys=sort_keys)
+    separator = '[\n'
+    chunk = []
+
+    for item in iterator:
+        chunk.append(encode(item))
+        if len(chunk) >= chunk_size:
+            output_file.write(separator + ',\n'.join(chunk))
+            separator = ',\n'
+            chunk = []
+
+    if chunk:
+        output_file.write(separator + ',\n'.join(chunk))
+        separator = ',\n'
+
+    output_file.write('\n]' if separator == ',\n' else '[]')
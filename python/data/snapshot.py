@@ -0,0 +1,186 @@
+import functools
+import gzip
+import importlib
+import json
+import logging
+import os
+import uuid
+from itertools import count, islice
+from multiprocessing import Pool
+
+from data import columnar
+from data.json import stream_json, stream_json_lines, json_decoder
+
+# Content snapshots are either a single JSON array (content.json.gz),
+# or JSON Lines with one item per line (content.jsonl.gz). The format
+# is picked from the filename, as is the compression: zstandard for
+# .zst, none for .json or .jsonl, otherwise gzip.
+#
+# A snapshot can also be sharded (content.manifest.json), in which
+# case the items are split, in order, between part files next to the
+# manifest (content-<id>-00000.jsonl.gz, ...). The parts can be read
+# by separate processes, see map_items. Each write names its parts
+# with a new id, so a sharded snapshot can be rewritten in place while
+# it's being read.
+#
+# Snapshots with a .parquet extension are columnar, see data.columnar.
+# Writing one needs a schema.
+
+MANIFEST_SUFFIX = '.manifest.json'
+
+# ijson backends, fastest first. The C backends need yajl installed,
+# and yajl2_c (ijson 2.4 and later) is only built if yajl's headers are
+# found when ijson is installed.
+IJSON_BACKENDS = ('yajl2_c', 'yajl2_cffi', 'yajl2', 'python')
+
+logger = logging.getLogger('snapshot')
+
+@functools.lru_cache()
+def ijson_backend(backends=IJSON_BACKENDS):
+    # Returns the name and module of the first ijson backend that
+    # loads, as `import ijson` doesn't always pick the fastest one
+    for name in backends:
+        try:
+            backend = importlib.import_module('ijson.backends.' + name)
+        except ImportError:
+            continue
+
+        logger.info('Parsing JSON with the ijson %s backend', name)
+        return name, backend
+
+    raise ImportError("None of the ijson backends {} could be loaded".format(backends))
+
+def is_json_lines(filename):
+    return '.jsonl' in os.path.basename(filename)
+
+def is_columnar(filename):
+    return filename.endswith('.parquet')
+
+def is_manifest(filename):
+    return filename.endswith(MANIFEST_SUFFIX)
+
+def open_snapshot(filename, mode='rt'):
+    if filename.endswith('.zst'):
+        # zstandard is optional, and only needed for .zst snapshots
+        import zstandard
+        return zstandard.open(filename, mode=mode)
+
+    if filename.endswith(('.json', '.jsonl')):
+        return open(filename, mode=mode)
+
+    return gzip.open(filename, mode=mode)
+
+def read_items(filename, decoder='auto', backends=IJSON_BACKENDS):
+    if is_manifest(filename):
+        for part_filename in read_manifest(filename):
+            yield from read_items(part_filename, decoder=decoder, backends=backends)
+        return
+
+    if is_columnar(filename):
+        yield from columnar.read_items(filename, decoder=decoder)
+        return
+
+    with open_snapshot(filename, mode='rt') as snapshot_file:
+        if is_json_lines(filename):
+            decode = json_decoder(decoder)
+            for line in snapshot_file:
+                if line.strip():
+                    yield decode(line)
+        else:
+            _, backend = ijson_backend(backends)
+            # ijson works on bytes, so skip decoding the file as text
+            yield from backend.items(getattr(snapshot_file, 'buffer', snapshot_file), prefix='item')
+
+def write_items(filename, iterator, schema=None, **json_options):
+    if is_manifest(filename):
+        return write_sharded_items(filename, iterator, schema=schema, **json_options)
+
+    if is_columnar(filename):
+        if schema is None:
+            raise ValueError("A schema is needed to write {}".format(filename))
+        return columnar.write_items(filename, iterator, schema)
+
+    with open_snapshot(filename, mode='wt') as snapshot_file:
+        if is_json_lines(filename):
+            json_options.pop('compact', None)
+            stream_json_lines(snapshot_file, iterator, **json_options)
+        else:
+            stream_json(snapshot_file, iterator, **json_options)
+
+def read_manifest(filename):
+    with open(filename, mode='r') as manifest_file:
+        manifest = json.load(manifest_file)
+
+    dirname = os.path.dirname(filename)
+    return [os.path.join(dirname, part['filename']) for part in manifest['parts']]
+
+def write_sharded_items(filename,
+                        iterator,
+                        shard_size=10000,
+                        part_extension='.jsonl.gz',
+                        **json_options):
+    prefix = '{}-{}'.format(filename[:-len(MANIFEST_SUFFIX)], uuid.uuid4().hex[:8])
+    iterator = iter(iterator)
+    parts = []
+
+    for index in count():
+        try:
+            first_item = next(iterator)
+        except StopIteration:
+            break
+
+        part_filename = '{}-{:05d}{}'.format(prefix, index, part_extension)
+        part_count = [0]
+
+        def part_items():
+            for item in __chain_first(first_item, islice(iterator, shard_size - 1)):
+                part_count[0] += 1
+                yield item
+
+        write_items(part_filename, part_items(), **json_options)
+        parts.append({'filename': os.path.basename(part_filename), 'count': part_count[0]})
+
+    # The manifest is written last, and replaces any previous one in a
+    # single rename, so a partly written snapshot can't be mistaken for
+    # a complete one. The parts of the previous snapshot are removed
+    # after that.
+    previous_parts = read_manifest(filename) if os.path.exists(filename) else []
+
+    temp_filename = os.path.join(os.path.dirname(filename), 'temp.' + os.path.basename(filename))
+    with open(temp_filename, mode='w') as manifest_file:
+        json.dump({'count': sum(part['count'] for part in parts), 'parts': parts}, manifest_file, indent=4)
+    os.replace(temp_filename, filename)
+
+    for part_filename in previous_parts:
+        if os.path.exists(part_filename):
+            os.remove(part_filename)
+
+def map_items(function, filename, workers=None, chunksize=100):
+    # Applies function to each item in the snapshot on a pool of
+    # worker processes, yielding the results in order. function must
+    # be picklable, i.e. defined at the top level of a module.
+    #
+    # For a sharded snapshot, each worker reads whole parts itself, so
+    # the parsing is spread across the processes too. Otherwise the
+    # snapshot is read in this process.
+    with Pool(workers) as pool:
+        if is_manifest(filename):
+            for results in pool.imap(functools.partial(__map_part, function), read_manifest(filename)):
+                yield from results
+        else:
+            yield from pool.imap(function, read_items(filename), chunksize=chunksize)
+
+def parallel_read_items(filename, workers=None):
+    return map_items(__identity, filename, workers=workers)
+
+# PRIVATE
+
+def __chain_first(first_item, iterator):
+    yield first_item
+    yield from iterator
+
+def __map_part(function, part_filename):
+    return [function(item) for item in read_items(part_filename)]
+
+def __identity(item):
+    return item
@@ -1,51 +1,84 @@
 from data_extraction import rummager
 from lib import plek
-from lib.helpers import slice, dig, merge
-import requests
+from lib.helpers import compile_path, compile_slice, merge
+from lib.session import default_session, pooled_session
 
 
 def content_links_generator(page_size=1000,
                             additional_search_fields = {},
                             rummager_url=plek.find('search-api'),
-                            blacklist_document_types=[]):
+                            blacklist_document_types=[],
+                            concurrency=1):
     search_dict = merge({'reject_content_store_document_type': blacklist_document_types,
                          'fields': ['link'],
                          'debug': 'include_withdrawn'},
                         additional_search_fields)
-    search_results = rummager.Rummager(rummager_url).search_generator(search_dict, page_size=page_size)
+    search_results = rummager.Rummager(
+        rummager_url,
+        session=pooled_session(pool_size=concurrency)
+    ).search_generator(search_dict, page_size=page_size, concurrency=concurrency)
     return map(lambda h: h.get('link'), search_results)
 
 
+__taxons = compile_path('links', 'taxons')
+__ppo = compile_path('links', 'primary_publishing_organisation')
+__logo = compile_path('links', 'organisations', 0, 'details', 'logo', 'formatted-title')
+
+
 def content_dict_slicer(content_dict, base_fields=[], taxon_fields=[], ppo_fields=[]):
-    result = slice(content_dict, base_fields)
-    taxons = dig(content_dict, 'links', 'taxons')
-    ppo = dig(content_dict, 'links', 'primary_publishing_organisation')
+    return compile_content_dict_slicer(base_fields, taxon_fields, ppo_fields)(content_dict)
+
+
+def compile_content_dict_slicer(base_fields=[], taxon_fields=[], ppo_fields=[]):
+    # Returns a function equivalent to content_dict_slicer with these
+    # fields, for slicing many content items
+    base_slicer = compile_slice(base_fields)
+    taxon_slicer = compile_slice(taxon_fields)
+    ppo_slicer = compile_slice(ppo_fields)
+
+    def slicer(content_dict):
+        result = base_slicer(content_dict)
+        taxons = __taxons(content_dict)
+        ppo = __ppo(content_dict)
 
-    if taxons:
-        result['taxons'] = [slice(taxon, taxon_fields) for taxon in taxons]
-    if ppo:
-        result['primary_publishing_organisation'] = slice(ppo[0], ppo_fields)
+        if taxons:
+            result['taxons'] = [taxon_slicer(taxon) for taxon in taxons]
+        if ppo:
+            result['primary_publishing_organisation'] = ppo_slicer(ppo[0])
 
-    return result
+        return result
+
+    return slicer
 
 
 def untagged_dict_slicer(content_dict, base_fields=[], ppo_fields=[]):
-    result = slice(content_dict, base_fields)
+    return compile_untagged_dict_slicer(base_fields, ppo_fields)(content_dict)
+
+
+def compile_untagged_dict_slicer(base_fields=[], ppo_fields=[]):
+    base_slicer = compile_slice(base_fields)
+    ppo_slicer = compile_slice(ppo_fields)
+
+    def slicer(content_dict):
+        result = base_slicer(content_dict)
+
+        logo = __logo(content_dict)
+        ppo = __ppo(content_dict)
 
-    logo = dig(content_dict, 'links', 'organisations', 0, 'details', 'logo', 'formatted-title')
-    ppo = dig(content_dict, 'links', 'primary_publishing_organisation')
+        if logo:
+            result['logo'] = logo
+        if ppo:
+            result['primary_publishing_organisation'] = ppo_slicer(ppo[0])
 
-    if logo:
-        result['logo'] = logo
-    if ppo:
-        result['primary_publishing_organisation'] = slice(ppo[0], ppo_fields)
+        return result
 
-    return result
+    return slicer
 
 
 def get_content(base_path,
-                content_store_url=plek.find('content-store')):
-    content_dict = __get_content_dict(base_path, content_store_url)
+                content_store_url=plek.find('content-store'),
+                session=None):
+    content_dict = __get_content_dict(base_path, content_store_url, session or default_session())
 
     if not content_dict:
         return False
@@ -65,11 +98,11 @@ def get_content(base_path,
 # PRIVATE
 
 
-def __get_content_dict(path, content_store_url):
+def __get_content_dict(path, content_store_url, session):
 
     url = "{content_store_url}/content{path}".format(content_store_url=content_store_url, path=path)
-    response = requests.get(url)
+    response = session.get(url)
     if response.status_code == 200:
-        return requests.get(url).json()
+        return response.json()
     else:
         return False
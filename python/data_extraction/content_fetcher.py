@@ -0,0 +1,35 @@
+from data_extraction import content_export
+from lib import plek
+from lib.concurrency import imap_ordered
+from lib.session import pooled_session
+
+
+# Fetches content items from the Content Store from a pool of
+# threads, all sharing a single keep-alive session with retries and
+# an optional per-host rate limit.
+class ContentFetcher():
+    def __init__(self,
+                 content_store_url=plek.find('content-store'),
+                 concurrency=16,
+                 requests_per_second=None,
+                 retries=3,
+                 backoff_factor=0.5,
+                 session=None):
+        self.content_store_url = content_store_url
+        self.concurrency = concurrency
+        self.session = session or pooled_session(pool_size=concurrency,
+                                                 retries=retries,
+                                                 backoff_factor=backoff_factor,
+                                                 requests_per_second=requests_per_second)
+
+    @property
+    def stats(self):
+        return self.session.stats
+
+    def get_content(self, base_path):
+        return content_export.get_content(base_path,
+                                          content_store_url=self.content_store_url,
+                                          session=self.session)
+
+    def imap(self, base_paths):
+        return imap_ordered(self.get_content, base_paths, concurrency=self.concurrency)
@@ -0,0 +1,112 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import re
+
+
+# An index of the content items in a content.json.gz snapshot, stored
+# next to it, mapping each content_id to its base_path, updated_at and
+# a hash of the item. The watermark records when the snapshot was
+# taken, so the next export only needs to ask Rummager for content
+# that has changed since then.
+#
+# Rummager can only filter on public_timestamp, which changes on first
+# publication and major updates. Retagging, minor edits and
+# withdrawals change the updated_at of a content item, but not its
+# public_timestamp, so an incremental export misses them. The index
+# records when the last full export was taken, so the snapshot can be
+# exported in full again once that is too old.
+
+def index_filename(snapshot_filename):
+    return re.sub(r'(\.json)?(\.gz|\.zst)?$', '', snapshot_filename, count=1) + '.index.json.gz'
+
+
+def content_hash(content_item):
+    # ijson returns numbers as Decimals, which the json module can't
+    # serialise, hence default=str
+    serialised = json.dumps(content_item, sort_keys=True, default=str)
+    return hashlib.sha1(serialised.encode('utf-8')).hexdigest()
+
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def age_in_days(timestamp, at=None):
+    then = datetime.datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    return (datetime.datetime.strptime(at or now(), TIMESTAMP_FORMAT) - then).total_seconds() / 86400
+
+
+class ContentIndex():
+    def __init__(self, watermark=None, items=None, full_export_at=None):
+        self.watermark = watermark
+        self.items = items or {}
+        self.full_export_at = full_export_at
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, content_id):
+        return content_id in self.items
+
+    def add(self, content_item):
+        self.items[content_item['content_id']] = (
+            content_item.get('base_path'),
+            content_item.get('updated_at'),
+            content_hash(content_item),
+        )
+
+    def unchanged(self, content_item):
+        entry = self.items.get(content_item['content_id'])
+        return entry is not None and entry[2] == content_hash(content_item)
+
+    def updated(self, content_item):
+        # Whether the Content Store has updated the item since it was
+        # indexed, including changes that don't touch public_timestamp
+        entry = self.items.get(content_item['content_id'])
+        return entry is not None and entry[1] != content_item.get('updated_at')
+
+    def needs_full_export(self, max_age_days, at=None):
+        # Changes that only touch updated_at are picked up by exporting
+        # all of the content again, at least every max_age_days
+        if self.watermark is None or self.full_export_at is None:
+            return True
+        return age_in_days(self.full_export_at, at=at) >= max_age_days
+
+    def indexing(self, content_items):
+        for content_item in content_items:
+            self.add(content_item)
+            yield content_item
+
+    def search_fields_since_watermark(self):
+        # Rummager only filters on dates, so this can include some
+        # items changed earlier on the day of the watermark. These are
+        # just fetched again.
+        return {'filter_public_timestamp': 'from:{}'.format(self.watermark[:10])}
+
+    @classmethod
+    def load(cls, filename):
+        if not os.path.exists(filename):
+            return cls()
+
+        with gzip.open(filename, mode='rt') as index_file:
+            index = json.load(index_file)
+
+        # Indexes saved before full_export_at was recorded have none,
+        # so are treated as needing a full export
+        return cls(
+            watermark=index['watermark'],
+            items={content_id: tuple(entry) for content_id, entry in index['items'].items()},
+            full_export_at=index.get('full_export_at')
+        )
+
+    def save(self, filename):
+        with gzip.open(filename, mode='wt') as index_file:
+            json.dump({'watermark': self.watermark,
+                       'full_export_at': self.full_export_at,
+                       'items': self.items}, index_file)
@@ -1,17 +1,22 @@
 import data
+from data import columnar
+from data import snapshot
 from data.json import stream_json
 from data_extraction import content_export
+from data_extraction.content_fetcher import ContentFetcher
+from data_extraction import content_index
 from data_extraction import taxonomy_query
 from lib import plek
-from lib.helpers import dig
+from lib.concurrency import fan_out
+from lib.helpers import compile_path
+from collections import Counter
 import functools
 import progressbar
-from multiprocessing import Pool
+import csv
 import gzip
 import json
 import os
 import sys
-import ijson
 
 
 config_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', 'config', 'data_export_fields.json')
@@ -19,6 +24,8 @@ config_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', 'co
 with open(config_path) as json_data_file:
     configuration = json.load(json_data_file)
 
+__taxons = compile_path('links', 'taxons')
+
 def notty_progress_bar():
     def process(data):
         count = 0
@@ -38,27 +45,40 @@ def jenkins_compatible_progress_bar(*args, **kwargs):
     else:
         return notty_progress_bar()
 
-def __transform_content(input_filename="data/content.json.gz",
-                        output_filename="data/filtered_content.json.gz",
-                        transform_function=lambda x: x):
-    with gzip.open(input_filename, mode='rt') as input_file:
-        with gzip.open(output_filename, mode='wt') as output_file:
-            content_generator = ijson.items(input_file, prefix='item')
-            stream_json(output_file, transform_function(content_generator))
+def json_options(compact=False):
+    # Compact JSON has no indentation or sorted keys, and is encoded
+    # with the fastest JSON library available. It's much quicker to
+    # write, and smaller, but harder to read.
+    if compact:
+        return {'compact': True, 'sort_keys': False, 'encoder': 'auto'}
+    return {}
 
 
-def __get_all_content(blacklist_document_types=[]):
-    get_content = functools.partial(
-        content_export.get_content,
-        content_store_url=plek.find('content-store')
-    )
+def __content_sink(output_filename, transform_function, compact=False, schema_function=None):
+    # The schema is only built for columnar (.parquet) output, as it
+    # needs pyarrow
+    def sink(content_items):
+        schema = None
+        if schema_function and snapshot.is_columnar(output_filename):
+            schema = schema_function()
+
+        snapshot.write_items(output_filename,
+                             transform_function(content_items),
+                             schema=schema,
+                             **json_options(compact))
+
+    return sink
 
+
+def __get_content_links(blacklist_document_types=[], additional_search_fields={}):
     progress_bar = jenkins_compatible_progress_bar()
 
     content_links_list = list(
         progress_bar(
             content_export.content_links_generator(
-                blacklist_document_types=blacklist_document_types
+                blacklist_document_types=blacklist_document_types,
+                additional_search_fields=additional_search_fields,
+                concurrency=4
             )
         )
     )
@@ -69,11 +89,52 @@ def __get_all_content(blacklist_document_types=[]):
     if duplicate_links > 0:
         print("{} duplicate links from Rummager".format(duplicate_links))
 
-    pool = Pool(4)
-    return pool.imap(get_content, content_links_set), len(content_links_set)
+    return content_links_set
+
+
+def __content_fetcher(concurrency=16, requests_per_second=None):
+    return ContentFetcher(
+        content_store_url=plek.find('content-store'),
+        concurrency=concurrency,
+        requests_per_second=requests_per_second
+    )
+
+
+def __unique(iterator, duplicates):
+    seen = set()
+    for item in iterator:
+        if item in seen:
+            duplicates.append(item)
+            continue
+
+        seen.add(item)
+        yield item
+
+
+def __get_all_content(blacklist_document_types=[], concurrency=16, requests_per_second=None):
+    # Links are fetched from the Content Store as soon as Rummager
+    # returns them, rather than waiting for all of the pages of links
+    fetcher = __content_fetcher(concurrency=concurrency, requests_per_second=requests_per_second)
+    duplicate_links = []
+
+    content_links = __unique(
+        content_export.content_links_generator(
+            blacklist_document_types=blacklist_document_types,
+            concurrency=4
+        ),
+        duplicate_links
+    )
+
+    return fetcher.imap(content_links), duplicate_links, fetcher.stats
 
 
-def export_content(output_filename="data/content.json.gz"):
+def export_content(output_filename="data/content.json.gz",
+                   concurrency=16,
+                   requests_per_second=None,
+                   index_filename=None,
+                   compact=False):
+    watermark = content_index.now()
+    index = content_index.ContentIndex(watermark=watermark, full_export_at=watermark)
     blacklist_document_types = data.document_types_excluded_from_the_topic_taxonomy()
     seen_content_ids = set()
     duplicate_content_ids = []
@@ -98,13 +159,27 @@ def export_content(output_filename="data/content.json.gz"):
         seen_content_ids.add(content_id)
         return True
 
-    content_iterator, count = __get_all_content(blacklist_document_types=blacklist_document_types)
+    content_iterator, duplicate_links, request_stats = __get_all_content(
+        blacklist_document_types=blacklist_document_types,
+        concurrency=concurrency,
+        requests_per_second=requests_per_second
+    )
     content = filter(filter_content, content_iterator)
 
-    progress_bar = jenkins_compatible_progress_bar(max_value=count)
+    if index_filename:
+        content = index.indexing(content)
 
-    with gzip.open(output_filename, 'wt') as output_file:
-        stream_json(output_file, progress_bar(content))
+    progress_bar = jenkins_compatible_progress_bar()
+
+    snapshot.write_items(output_filename, progress_bar(content), **json_options(compact))
+
+    if index_filename:
+        index.save(index_filename)
+
+    print("Content Store: {}".format(request_stats.summary()))
+
+    if len(duplicate_links) > 0:
+        print("{} duplicate links from Rummager".format(len(duplicate_links)))
 
     duplicate_content_ids_count = len(set(duplicate_content_ids))
     print("Seen {} duplicate content ids".format(
@@ -116,38 +191,194 @@ def export_content(output_filename="data/content.json.gz"):
         print("content_id: %s : document_type: %s" % (bc['content_id'], bc['document_type']))
 
 
-def export_filtered_content(input_filename="data/content.json.gz", output_filename="data/filtered_content.json.gz"):
-    slicer = functools.partial(content_export.content_dict_slicer,
-                               base_fields=configuration['base_fields'],
-                               taxon_fields=configuration['taxon_fields'],
-                               ppo_fields=configuration['ppo_fields'])
+def export_content_incremental(previous_filename="data/content.json.gz",
+                               output_filename="data/content.json.gz",
+                               concurrency=16,
+                               requests_per_second=None,
+                               compact=False,
+                               full_export_after_days=7):
+    # Only content with a new public_timestamp is fetched again, which
+    # misses retagging, minor edits and withdrawals (see content_index),
+    # so all of the content is exported once the last full export is
+    # more than full_export_after_days old
+    previous_index = content_index.ContentIndex.load(content_index.index_filename(previous_filename))
+
+    if not os.path.exists(previous_filename) or \
+            previous_index.needs_full_export(full_export_after_days):
+        print("No recent full export of {}, exporting all content".format(previous_filename))
+        export_content(output_filename=output_filename,
+                       concurrency=concurrency,
+                       requests_per_second=requests_per_second,
+                       index_filename=content_index.index_filename(output_filename),
+                       compact=compact)
+        return
+
+    index = content_index.ContentIndex(watermark=content_index.now(),
+                                       full_export_at=previous_index.full_export_at)
+    blacklist_document_types = data.document_types_excluded_from_the_topic_taxonomy()
+
+    print("Finding content changed since {}".format(previous_index.watermark))
+    changed_links = __get_content_links(
+        blacklist_document_types=blacklist_document_types,
+        additional_search_fields=previous_index.search_fields_since_watermark()
+    )
+
+    # All the links are still needed to spot content that has been
+    # removed, but listing them is cheap compared to fetching content
+    print("Finding live content")
+    live_links = __get_content_links(blacklist_document_types=blacklist_document_types)
+
+    fetcher = __content_fetcher(concurrency=concurrency, requests_per_second=requests_per_second)
+    progress_bar = jenkins_compatible_progress_bar(max_value=len(changed_links))
+
+    changed_content = {}
+    for content in progress_bar(fetcher.imap(changed_links)):
+        if not content:
+            continue
+        if content.get('document_type') in blacklist_document_types:
+            continue
+        changed_content[content['content_id']] = content
+
+    print("Content Store: {}".format(fetcher.stats.summary()))
+
+    removed_content_ids = []
+
+    def merged_content():
+        for content_item in snapshot.read_items(previous_filename):
+            if content_item['content_id'] in changed_content:
+                continue
+
+            if content_item['base_path'] in changed_links or \
+                    content_item['base_path'] not in live_links:
+                removed_content_ids.append(content_item['content_id'])
+                continue
+
+            yield content_item
+
+        yield from changed_content.values()
+
+    # Keep the extension, as it sets the format of the snapshot. A
+    # sharded snapshot is written straight to output_filename, as its
+    # parts get new names, and the manifest is replaced in one rename.
+    if snapshot.is_manifest(output_filename):
+        temp_filename = output_filename
+    else:
+        temp_filename = os.path.join(os.path.dirname(output_filename), 'temp.' + os.path.basename(output_filename))
+
+    snapshot.write_items(temp_filename, index.indexing(merged_content()), **json_options(compact))
+
+    if temp_filename != output_filename:
+        os.rename(temp_filename, output_filename)
+    index.save(content_index.index_filename(output_filename))
+
+    new_content_ids = [content_id for content_id in changed_content
+                       if content_id not in previous_index]
+    updated_content = [content for content in changed_content.values()
+                       if previous_index.updated(content)]
+
+    print("Fetched {} changed links: {} new, {} updated, {} unchanged content items".format(
+        len(changed_links),
+        len(new_content_ids),
+        len(updated_content),
+        len(changed_content) - len(new_content_ids) - len(updated_content)
+    ))
+    print("Removed {} content items".format(len(removed_content_ids)))
+    print("Changes without a new public_timestamp, like retagging, are exported {} days after the last full export at {}".format(
+        full_export_after_days,
+        previous_index.full_export_at
+    ))
+
+
+def filtered_content_sink(output_filename="data/filtered_content.json.gz", compact=False):
+    slicer = content_export.compile_content_dict_slicer(base_fields=configuration['base_fields'],
+                                                        taxon_fields=configuration['taxon_fields'],
+                                                        ppo_fields=configuration['ppo_fields'])
+
+    schema_function = functools.partial(columnar.content_schema,
+                                        base_fields=configuration['base_fields'],
+                                        taxon_fields=configuration['taxon_fields'],
+                                        ppo_fields=configuration['ppo_fields'])
 
-    __transform_content(input_filename=input_filename,
-                        output_filename=output_filename,
-                        transform_function=lambda iterator: map(slicer, iterator))
+    return __content_sink(output_filename,
+                          transform_function=lambda iterator: map(slicer, iterator),
+                          compact=compact,
+                          schema_function=schema_function)
 
 
-def export_untagged_content(input_filename="data/content.json.gz", output_filename="data/untagged_content.json.gz"):
+def untagged_content_sink(output_filename="data/untagged_content.json.gz", compact=False):
     def __filter_tagged(dict_in):
-        return dig(dict_in, 'links', 'taxons') is None
+        return __taxons(dict_in) is None
 
-    untagged_dict_slicer = functools.partial(content_export.untagged_dict_slicer,
-                                             base_fields=configuration['untagged_content_fields'],
-                                             ppo_fields=configuration['ppo_fields'])
+    untagged_dict_slicer = content_export.compile_untagged_dict_slicer(base_fields=configuration['untagged_content_fields'],
+                                                                       ppo_fields=configuration['ppo_fields'])
 
-    __transform_content(input_filename=input_filename,
-                        output_filename=output_filename,
-                        transform_function=lambda iterator: map(untagged_dict_slicer, filter(__filter_tagged, iterator)))
+    schema_function = functools.partial(columnar.content_schema,
+                                        base_fields=configuration['untagged_content_fields'],
+                                        ppo_fields=configuration['ppo_fields'],
+                                        extra_fields=['logo'])
 
+    return __content_sink(output_filename,
+                          transform_function=lambda iterator: map(untagged_dict_slicer, filter(__filter_tagged, iterator)),
+                          compact=compact,
+                          schema_function=schema_function)
 
-def export_taxons(output_filename="data/taxons.json.gz"):
-    def __taxonomy():
-        query = taxonomy_query.TaxonomyQuery()
-        level_one_taxons = query.level_one_taxons()
-        children = [taxon
-                    for level_one_taxon in level_one_taxons
-                    for taxon in query.child_taxons(level_one_taxon['base_path'])]
-        return iter(level_one_taxons + children)
+
+def counting_sink(key_function):
+    # Counts the content items by key_function(content_item), e.g. by
+    # document type
+    def sink(content_items):
+        return Counter(map(key_function, content_items))
+
+    return sink
+
+
+def transform_content(input_filename="data/content.json.gz", sinks=[]):
+    # Reads the content once, feeding every content item to each of
+    # the sinks, and returns what each sink returns
+    return fan_out(snapshot.read_items(input_filename), sinks)
+
+
+def export_filtered_content(input_filename="data/content.json.gz",
+                            output_filename="data/filtered_content.json.gz",
+                            compact=False):
+    transform_content(input_filename, [filtered_content_sink(output_filename, compact=compact)])
+
+
+def export_untagged_content(input_filename="data/content.json.gz",
+                            output_filename="data/untagged_content.json.gz",
+                            compact=False):
+    transform_content(input_filename, [untagged_content_sink(output_filename, compact=compact)])
+
+
+def export_filtered_and_untagged_content(input_filename="data/content.json.gz",
+                                         filtered_filename="data/filtered_content.json.gz",
+                                         untagged_filename="data/untagged_content.json.gz",
+                                         compact=False):
+    # Like export_filtered_content and export_untagged_content, but
+    # only reads the content once
+    _, _, tagged_counts = transform_content(
+        input_filename,
+        [
+            filtered_content_sink(filtered_filename, compact=compact),
+            untagged_content_sink(untagged_filename, compact=compact),
+            counting_sink(lambda content_item: __taxons(content_item) is not None),
+        ]
+    )
+
+    print("Exported {} content items, {} of them untagged".format(
+        sum(tagged_counts.values()),
+        tagged_counts[False]
+    ))
+
+
+def export_taxons(output_filename="data/taxons.json.gz", taxon_levels_filename=None, concurrency=4):
+    taxons, taxon_levels = taxonomy_query.TaxonomyQuery().taxonomy(concurrency=concurrency)
 
     with gzip.open(output_filename, 'wt') as output_file:
-        stream_json(output_file, __taxonomy())
+        stream_json(output_file, iter(taxons))
+
+    if taxon_levels_filename:
+        with gzip.open(taxon_levels_filename, 'wt', newline='') as output_file:
+            writer = csv.DictWriter(output_file, fieldnames=taxonomy_query.TAXON_LEVELS_HEADER)
+            writer.writeheader()
+            writer.writerows(taxon_levels)
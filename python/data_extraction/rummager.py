@@ -1,24 +1,62 @@
 from itertools import count
+from lib.concurrency import imap_ordered
 from lib.helpers import merge
 from lib import plek
-import requests
+from lib.session import default_session
 
 class Rummager():
 
-    def __init__(self, base_url=plek.find("search-api")):
+    def __init__(self, base_url=plek.find("search-api"), session=None):
         self.base_url = base_url
+        self.session = session or default_session()
 
-    def search_generator(self, args, page_size=100):
-        for index in count(0, page_size):
-            search_params = merge(args, {"start": index, "count": page_size})
-            results = self.__search(search_params).get('results', [])
+    def search_generator(self, args, page_size=100, concurrency=1):
+        if concurrency > 1:
+            yield from self.__parallel_search_generator(args, page_size, concurrency)
+        else:
+            yield from self.__sequential_search_generator(args, page_size)
+
+    # PRIVATE
+
+    def __sequential_search_generator(self, args, page_size, start=0):
+        for index in count(start, page_size):
+            results = self.__search_page(args, index, page_size).get('results', [])
             for result in results:
                 yield result
             if len(results) < page_size:
                 break
 
-    # PRIVATE
+    def __parallel_search_generator(self, args, page_size, concurrency):
+        # The first page tells us how many results there are, after
+        # which the offsets of the remaining pages are known, so they
+        # can be requested concurrently and yielded in order.
+        first_page = self.__search_page(args, 0, page_size)
+        results = first_page.get('results', [])
+        yield from results
+
+        if len(results) < page_size:
+            return
+        if 'total' not in first_page:
+            yield from self.__sequential_search_generator(args, page_size, start=page_size)
+            return
+
+        offsets = range(page_size, first_page['total'], page_size)
+        pages = imap_ordered(lambda index: self.__search_page(args, index, page_size),
+                             offsets,
+                             concurrency=concurrency)
+
+        results = []
+        for results in map(lambda page: page.get('results', []), pages):
+            yield from results
+
+        # Carry on a page at a time in case more results were added
+        # whilst paginating
+        if len(results) == page_size:
+            yield from self.__sequential_search_generator(args, page_size, start=offsets[-1] + page_size)
+
+    def __search_page(self, args, start, page_size):
+        return self.__search(merge(args, {"start": start, "count": page_size}))
 
     def __search(self, args):
         request_url = "{base_url}/search.json".format(base_url=self.base_url)
-        return requests.get(request_url, args).json()
+        return self.session.get(request_url, params=args).json()
@@ -1,39 +1,103 @@
 from lib import plek
-import requests
-from lib.helpers import slice, dig
+from lib.concurrency import imap_ordered
+from lib.helpers import compile_path, slice, dig
+from lib.session import default_session
+
+
+# Columns of the flat taxonomy table, one row per taxon, with the
+# titles of the taxon and its ancestors from level one downwards. This
+# is the table written out by clean_taxons.py.
+TAXON_LEVELS = 5
+TAXON_LEVELS_HEADER = ['base_path', 'content_id', 'taxon_name'] + \
+                      ['level{}taxon'.format(level) for level in range(1, TAXON_LEVELS + 1)]
 
 
 class TaxonomyQuery():
+    # taxon_linked_to_root and content_linked_to_root are called for
+    # every content item, so these paths are compiled once
+    __parent_taxon = staticmethod(compile_path("parent_taxons", 0))
+    __root_taxon = staticmethod(compile_path("links", "root_taxon"))
+    __taxons = staticmethod(compile_path("links", "taxons"))
+
     def __init__(self, key_list=("content_id", "base_path", "title"),
-                 content_store_url=plek.find("content-store")):
+                 content_store_url=plek.find("content-store"),
+                 session=None):
         self.content_store_url = content_store_url
         self.key_list = key_list
+        self.session = session or default_session()
+        self.__content_dicts = {}
+        self.__linked_to_root = {}
 
     def level_one_taxons(self):
-        taxons = dig(self.__get_content_dict('/'), "links", "level_one_taxons")
+        taxons = self.__level_one_taxons()
         return [slice(taxon, self.key_list) for taxon in taxons]
 
     def child_taxons(self, base_path):
-        root_content_dict = self.__get_content_dict(base_path)
-        taxons = dig(root_content_dict, "links", "child_taxons") or []
-        return self.__recursive_child_taxons(taxons, root_content_dict['content_id'])
+        return [child for child, _ in self.__crawl(base_path)]
+
+    def taxonomy(self, concurrency=4):
+        # Crawls the whole taxonomy, fetching the level one taxons'
+        # subtrees concurrently. Returns the taxons, in the same order
+        # as the level one taxons followed by each of their
+        # child_taxons, along with the flat taxonomy table.
+        level_one_taxons = self.__level_one_taxons()
+
+        taxons = [slice(taxon, self.key_list) for taxon in level_one_taxons]
+        table = [self.__taxon_levels_row(taxon, [taxon.get('title')]) for taxon in level_one_taxons]
+
+        subtrees = imap_ordered(
+            lambda taxon: self.__crawl(taxon['base_path'], [taxon.get('title')]),
+            level_one_taxons,
+            concurrency=concurrency
+        )
+
+        for subtree in subtrees:
+            for child, path in subtree:
+                taxons.append(child)
+                table.append(self.__taxon_levels_row(child, path))
+
+        return taxons, table
 
     def taxon_linked_to_root(self, dict):
-        if dict is None:
-            return False
-        links = dict.get("links")
-        if "root_taxon" in links:
-            return True
-        return self.taxon_linked_to_root(dig(links, "parent_taxons", 0))
+        # Whether a taxon is linked to the root depends only on the
+        # taxon, so the result is memoised for every taxon on the way
+        # up the parent_taxons chain. This is called for every taxon
+        # on every content item, but there are only a few thousand
+        # taxons.
+        taxon = dict
+        linked = False
+        visited_content_ids = []
+
+        while taxon is not None:
+            content_id = taxon.get("content_id")
+            if content_id in self.__linked_to_root:
+                linked = self.__linked_to_root[content_id]
+                break
+            if content_id is not None:
+                visited_content_ids.append(content_id)
+
+            links = taxon.get("links")
+            if "root_taxon" in links:
+                linked = True
+                break
+            taxon = self.__parent_taxon(links)
+
+        for content_id in visited_content_ids:
+            self.__linked_to_root[content_id] = linked
+
+        return linked
 
     def content_linked_to_root(self, content_dict):
-        if dig(content_dict, "links", "root_taxon") is not None:
+        if self.__root_taxon(content_dict) is not None:
             return True
-        taxons = dig(content_dict, "links", "taxons") or []
+        taxons = self.__taxons(content_dict) or []
         return any(self.taxon_linked_to_root(taxon) for taxon in taxons)
 
     # PRIVATE
 
+    def __level_one_taxons(self):
+        return dig(self.__get_content_dict('/'), "links", "level_one_taxons")
+
     def __build_child_dict(self, taxon, parent_content_id):
         sliced_dict = slice(taxon, key_list=self.key_list)
         sliced_dict['parent_content_id'] = parent_content_id
@@ -43,14 +107,37 @@ class TaxonomyQuery():
     def __child_taxons(taxon):
         return dig(taxon, 'links', 'child_taxons') or []
 
-    def __recursive_child_taxons(self, taxons, parent_content_id):
-        current_taxons = [self.__build_child_dict(taxon, parent_content_id) for taxon in taxons]
-        children = [descendents
-                    for taxon in taxons
-                    for descendents in self.__recursive_child_taxons(self.__child_taxons(taxon), taxon['content_id'])
-                    ]
-        return current_taxons + children
+    @staticmethod
+    def __taxon_levels_row(taxon, path):
+        levels = (path + [None] * TAXON_LEVELS)[:TAXON_LEVELS]
+        return dict(zip(TAXON_LEVELS_HEADER,
+                        [taxon.get('base_path'), taxon.get('content_id'), taxon.get('title')] + levels))
+
+    def __crawl(self, base_path, root_path=[]):
+        # Walks the expanded child_taxons links of the taxon at
+        # base_path, returning (child dict, titles from the root to the
+        # child) pairs. Each set of siblings is output together, before
+        # the descendants of each sibling in turn.
+        root_content_dict = self.__get_content_dict(base_path)
+        output = []
+        stack = [(self.__child_taxons(root_content_dict), root_content_dict['content_id'], root_path)]
+
+        while stack:
+            siblings, parent_content_id, parent_path = stack.pop()
+            paths = [parent_path + [taxon.get('title')] for taxon in siblings]
+
+            for taxon, path in zip(siblings, paths):
+                output.append((self.__build_child_dict(taxon, parent_content_id), path))
+
+            for taxon, path in reversed(list(zip(siblings, paths))):
+                children = self.__child_taxons(taxon)
+                if children:
+                    stack.append((children, taxon['content_id'], path))
+
+        return output
 
     def __get_content_dict(self, path):
-        url = "{base}/content{path}".format(base=self.content_store_url, path=path)
-        return requests.get(url).json()
+        if path not in self.__content_dicts:
+            url = "{base}/content{path}".format(base=self.content_store_url, path=path)
+            self.__content_dicts[path] = self.session.get(url).json()
+        return self.__content_dicts[path]
@@ -6,16 +6,11 @@ import warnings
 
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-from keras.preprocessing.sequence import pad_sequences
-from keras.utils import to_categorical
 from scipy import sparse
 from sklearn.exceptions import DataConversionWarning
-from sklearn.preprocessing import LabelEncoder
-from sklearn.preprocessing import MinMaxScaler
 from sklearn.utils import shuffle, resample
-import yaml
 import tokenizing
+from metadata_encoder import MetadataEncoder
 import json
 
 warnings.filterwarnings(action='ignore', category=DataConversionWarning)
@@ -23,6 +18,8 @@ warnings.filterwarnings(action='ignore', category=DataConversionWarning)
 DATADIR = os.getenv('DATADIR')
 METADATA_LIST = env_list = json.loads(os.environ['METADATA_LIST'])
 SINCE_THRESHOLD = os.getenv('SINCE_THRESHOLD')
+DATAPREP_WORKERS = int(os.getenv('DATAPREP_WORKERS') or 1)
+METADATA_ENCODER_FILENAME = 'metadata_encoder.pickle'
 
 def load_labelled(SINCE_THRESHOLD, level='level2'):
     if level=='agnostic' or level=='level1':
@@ -163,157 +160,64 @@ def upsample_low_support_taxons(dataframe, size_train):
     return balanced, upsampled_training.shape[0]
 
 
-def to_cat_to_hot(meta_df, var, valuelist):
-    """one hot encode each metavar"""
-    encoder = LabelEncoder()
-    encoder.fit(valuelist)
-    logging.info("classes_ {}".format(len(encoder.classes_)))
-    metavar_cat = var + "_cat"  # get categorical codes into new column
-    meta_df[metavar_cat] = encoder.transform(meta_df[var])
-    logging.info("meta_df[metavar_cat].shape {}".format(meta_df[metavar_cat].shape))
-    logging.info("max(meta_df[metavar_cat]) {}".format(max(meta_df[metavar_cat])))
-    # tf.cast(meta_df[metavar_cat], tf.float32)
-    return to_categorical(meta_df[metavar_cat], num_classes=len(valuelist))
-
-
-def create_meta(dataframe_column, orig_df):
-    with open(os.path.join(DATADIR, "metadata_lists.yaml"), "r") as f:
-        metadata_lists = yaml.load(f)
-    # extract content_id index to df
-    meta_df = pd.DataFrame(dataframe_column)
-
-
-    for meta_var in METADATA_LIST:
-        meta_df[meta_var] = meta_df['content_id'].map(
-            dict(zip(orig_df['content_id'], orig_df[meta_var]))
-        )
-
-    # convert nans to empty strings for labelencoder types
-    meta_df = meta_df.replace(np.nan, '', regex=True)
+def create_meta(dataframe_column, orig_df, encoder=None):
+    # One-hot encodes the METADATA_LIST variables of the content items
+    # in dataframe_column, taken from orig_df by content_id. Unless an
+    # encoder is given, one is fitted from metadata_lists.yaml.
+    if "first_published_at" in METADATA_LIST:
+        raise ValueError("first_published_at can't be encoded as metadata")
 
-    dict_of_onehot_encodings = {}
+    if encoder is None:
+        encoder = create_metadata_encoder()
 
     logging.info("Encoding metadata")
+    meta = encoder.transform_content(dataframe_column, orig_df)
 
-    for metavar in METADATA_LIST:
-        if metavar != "first_published_at":
-            logging.info(metavar)
-            valuelist = metadata_lists[metavar]
+    for variable, width in encoder.widths.items():
+        logging.info("Shape of {}: {}".format(variable, (meta.shape[0], width)))
 
-            if metavar == "primary_publishing_organisation":
-                valuelist += ['']
+    return meta
 
-            metavar_encoding = to_cat_to_hot(meta_df, metavar, valuelist)
-            logging.info("Shape of {}: {}".format(metavar, metavar_encoding.shape))
 
-            if metavar_encoding.shape[1] != len(valuelist):
-                raise Exception("metavar_encoding shape is wrong!")
+def create_metadata_encoder():
+    return MetadataEncoder.from_file(os.path.join(DATADIR, "metadata_lists.yaml"), METADATA_LIST)
 
-            dict_of_onehot_encodings[metavar] = metavar_encoding
 
-    # First_published_at:
-    # Convert to timestamp, then scale between 0 and 1 so same weight as binary vars
-    if 'first_published_at' in meta_df.columns:
-        meta_df['first_published_at'] = pd.to_datetime(meta_df['first_published_at'])
-        first_published = np.array(
-            meta_df['first_published_at']
-        ).reshape(
-            meta_df['first_published_at'].shape[0],
-            1
-        )
-
-        scaler = MinMaxScaler()
-        first_published_scaled = scaler.fit_transform(first_published)
-
-        last_year = np.where(
-            (
-                    (np.datetime64('today', 'D') - first_published).astype('timedelta64[Y]')
-                    <
-                    np.timedelta64(1, 'Y')
-            ),
-            1,
-            0
-        )
+def load_metadata_encoder():
+    # The encoder saved by dataprep, so new content is encoded with
+    # the same columns as the training data
+    filename = os.path.join(DATADIR, METADATA_ENCODER_FILENAME)
 
-        last_2years = np.where(
-            (
-                    (np.datetime64('today', 'D') - first_published).astype('timedelta64[Y]')
-                    <
-                    np.timedelta64(2, 'Y')
-            ),
-            1,
-            0
-        )
+    if not os.path.exists(filename):
+        logging.info("No {}, so fitting the metadata encoder".format(METADATA_ENCODER_FILENAME))
+        return create_metadata_encoder()
 
+    return MetadataEncoder.load(filename)
 
-        last_5years = np.where(
-            (
-                    (np.datetime64('today', 'D') - first_published).astype('timedelta64[Y]')
-                    <
-                    np.timedelta64(5, 'Y')
-            ),
-            1,
-            0
-        )
-
-        olderthan5 = np.where(
-            (
-                    (np.datetime64('today', 'D') - first_published).astype('timedelta64[Y]')
-                    >
-                    np.timedelta64(5, 'Y')
-            ),
-            1,
-            0
-        )
 
-
-    meta_arrays = []
-    if "document_type" in METADATA_LIST:
-        meta_arrays.append(dict_of_onehot_encodings['document_type'])
-    if "primary_publishing_organisation" in METADATA_LIST:
-        meta_arrays.append(dict_of_onehot_encodings['primary_publishing_organisation'])
-    if "publishing_app" in METADATA_LIST:
-        meta_arrays.append(dict_of_onehot_encodings['publishing_app'])
-    if "first_published_at" in METADATA_LIST:
-        meta_arrays.append(first_published_scaled, last_year, last_2years, last_5years, olderthan5)
-
-    meta_np = np.concatenate(meta_arrays, axis=1)
-
-    return sparse.csr_matrix(meta_np)
-
-
-def create_padded_combined_text_sequences(text_data):
-    tokenizer_combined_text = tokenizing. \
-        load_tokenizer_from_file(os.path.join(DATADIR, "combined_text_tokenizer.json"))
-
-    # Prepare combined text data for input into embedding layer
-    logging.info('Converting combined text to sequences')
-    tokenizer_combined_text.num_words = 20000
-    combined_text_sequences = tokenizer_combined_text.texts_to_sequences(
-        text_data
+def create_padded_combined_text_sequences(text_data, workers=DATAPREP_WORKERS):
+    # Only words with indices below 20000 are kept, and the sequences
+    # are padded and truncated to 1000 (MAX_SEQUENCE_LENGTH) at the end
+    encoder = tokenizing.SequenceEncoder(
+        tokenizing.load_word_index(os.path.join(DATADIR, "combined_text_tokenizer.json")),
+        num_words=20000,
+        maxlen=1000
     )
 
-    logging.info('Padding combined text sequences')
-    text_sequences_padded = pad_sequences(
-        combined_text_sequences,
-        maxlen=1000,  # MAX_SEQUENCE_LENGTH
-        padding='post', truncating='post'
-    )
-
-    return text_sequences_padded
+    logging.info('Converting combined text to padded sequences')
+    return encoder.encode(text_data, workers=workers)
 
 
 def create_one_hot_matrix_for_column(
-        tokenizer,
+        word_index,
         column_data,
         num_words,
+        dtype='float64',
 ):
-    tokenizer.num_words = num_words
-    return sparse.csr_matrix(
-        tokenizer.texts_to_matrix(
-            column_data
-        )
-    )
+    # A sparse matrix with a 1 for each word in a row with an index
+    # below num_words, built without a dense intermediate
+    encoder = tokenizing.BinaryMatrixEncoder(word_index, num_words=num_words, dtype=dtype)
+    return encoder.encode(column_data)
 
 
 def split(data_to_split, split_indices):
@@ -386,7 +290,14 @@ if __name__ == "__main__":
 
     logger.info('Vectorizing metadata')
 
-    meta = create_meta(balanced_df.index.get_level_values('content_id'), labelled_level2)
+    metadata_encoder = create_metadata_encoder()
+    metadata_encoder.save(os.path.join(DATADIR, METADATA_ENCODER_FILENAME))
+
+    meta = create_meta(
+        balanced_df.index.get_level_values('content_id'),
+        labelled_level2,
+        encoder=metadata_encoder
+    )
 
     # **** TOKENIZE TEXT ********************
     # ************************************
@@ -407,7 +318,7 @@ if __name__ == "__main__":
     logging.info('One-hot encoding title sequences')
 
     title_onehot = create_one_hot_matrix_for_column(
-        tokenizing.load_tokenizer_from_file(
+        tokenizing.load_word_index(
             os.path.join(DATADIR, "title_tokenizer.json")
         ),
         balanced_df.index.get_level_values('title'),
@@ -419,7 +330,7 @@ if __name__ == "__main__":
     logger.info('One-hot encoding description sequences')
 
     description_onehot = create_one_hot_matrix_for_column(
-        tokenizing.load_tokenizer_from_file(
+        tokenizing.load_word_index(
             os.path.join(DATADIR, "description_tokenizer.json")
         ),
         balanced_df.index.get_level_values('description'),
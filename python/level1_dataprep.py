@@ -88,7 +88,7 @@ if __name__ == "__main__":
     logging.info('One-hot encoding title sequences')
 
     title_onehot = create_one_hot_matrix_for_column(
-        tokenizing.load_tokenizer_from_file(
+        tokenizing.load_word_index(
             os.path.join(DATADIR, "title_tokenizer.json")
         ),
         balanced_df.index.get_level_values('title'),
@@ -100,7 +100,7 @@ if __name__ == "__main__":
     logger.info('One-hot encoding description sequences')
 
     description_onehot = create_one_hot_matrix_for_column(
-        tokenizing.load_tokenizer_from_file(
+        tokenizing.load_word_index(
             os.path.join(DATADIR, "description_tokenizer.json")
         ),
         balanced_df.index.get_level_values('description'),
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from itertools import islice
+from queue import Queue
+from threading import Event
+
+
+def imap_ordered(function, iterable, concurrency=4, max_in_flight=None, executor_class=ThreadPoolExecutor):
+    # Like Pool.imap, but on a pool of threads, for I/O bound work.
+    # Results are yielded in the order of iterable, and only a bounded
+    # number of calls are in flight at once, so iterable can be a
+    # (long) generator.
+    #
+    # For CPU bound work, pass executor_class=ProcessPoolExecutor, in
+    # which case function must be picklable.
+    max_in_flight = max_in_flight or concurrency * 2
+
+    with executor_class(max_workers=concurrency) as executor:
+        in_flight = deque()
+
+        for item in iterable:
+            in_flight.append(executor.submit(function, item))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def fan_out(iterable, consumers, chunk_size=100, max_in_flight=10):
+    # Feeds each item of iterable to every consumer, a function taking
+    # an iterator, so iterable is only read once. Each consumer runs in
+    # its own thread, reading chunk_size items at a time from a bounded
+    # queue. Returns the consumers' return values, in order.
+    #
+    # The same item objects are given to every consumer, so consumers
+    # mustn't modify them.
+    if len(consumers) == 1:
+        return [consumers[0](iter(iterable))]
+
+    queues = [Queue(maxsize=max_in_flight) for _ in consumers]
+    failed = Event()
+
+    with ThreadPoolExecutor(max_workers=len(consumers)) as executor:
+        futures = [
+            executor.submit(__consume, consumer, chunk_queue, failed)
+            for consumer, chunk_queue in zip(consumers, queues)
+        ]
+
+        try:
+            iterator = iter(iterable)
+            # Stop reading if a consumer has failed, rather than after
+            # the whole iterable. The error is raised by its result.
+            while not failed.is_set():
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    break
+
+                for chunk_queue in queues:
+                    chunk_queue.put(chunk)
+        finally:
+            for chunk_queue in queues:
+                chunk_queue.put(None)
+
+        return [future.result() for future in futures]
+
+# PRIVATE
+
+def __chunks(chunk_queue):
+    while True:
+        chunk = chunk_queue.get()
+        if chunk is None:
+            return
+        yield from chunk
+
+
+def __consume(consumer, chunk_queue, failed):
+    chunks = __chunks(chunk_queue)
+    try:
+        return consumer(chunks)
+    except Exception:
+        failed.set()
+        raise
+    finally:
+        # Read the rest of the queue if the consumer stops early, so
+        # that putting items in it never blocks
+        for _ in chunks:
+            pass
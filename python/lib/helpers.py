@@ -2,19 +2,52 @@ def slice(dict_in, key_list):
     return {key: value for (key, value) in dict_in.items() if key in key_list}
 
 
+def compile_slice(key_list):
+    # Returns a function equivalent to slice(dict_in, key_list), for
+    # slicing many dicts with the same keys. It looks up each key,
+    # rather than scanning every key of the dict.
+    key_list = tuple(key_list)
+
+    def slicer(dict_in):
+        return {key: dict_in[key] for key in key_list if key in dict_in}
+
+    return slicer
+
+
 def dig(dict_in, *key_list):
-    (head, *tail) = key_list
-    if isinstance(head, int) and isinstance(dict_in, list):
-        value = dict_in[head]
-    elif isinstance(head, str) and isinstance(dict_in, dict):
-        value = dict_in.get(head)
-    else:
-        return dict_in
-    if len(tail) == 0:
-        return value
-    else:
-        return dig(value, *tail)
+    return __dig_path(dict_in, __path_steps(key_list))
+
+
+def compile_path(*key_list):
+    # Returns a function equivalent to dig(dict_in, *key_list), for
+    # digging the same path out of many dicts
+    steps = __path_steps(key_list)
+
+    def dig_path(dict_in):
+        return __dig_path(dict_in, steps)
+
+    return dig_path
 
 
 def merge(dict_one, dict_two):
     return dict(dict_one, **dict_two)
+
+# PRIVATE
+
+def __path_steps(key_list):
+    # Integer keys index into lists, and string keys into dicts
+    return tuple(
+        (key, list if isinstance(key, int) else dict if isinstance(key, str) else None)
+        for key in key_list
+    )
+
+
+def __dig_path(value, steps):
+    for key, container_type in steps:
+        if container_type is list and isinstance(value, list):
+            value = value[key]
+        elif container_type is dict and isinstance(value, dict):
+            value = value.get(key)
+        else:
+            return value
+    return value
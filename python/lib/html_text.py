@@ -0,0 +1,80 @@
+import re
+import threading
+
+from lxml import etree
+
+# Extracts normalised text from the HTML in content items: the text
+# nodes, joined with spaces, lower cased, with commas and runs of
+# whitespace replaced by single spaces.
+#
+# Strings without markup, e.g. most titles and descriptions, aren't
+# parsed at all, as libxml2 would return their text unchanged. The
+# exceptions are entities, NUL characters, which end the text, and a
+# leading byte order mark, which is dropped.
+
+__local = threading.local()
+
+__full_html = re.compile(r'^\s*<(?:html|!doctype)', re.I | re.U)
+
+
+def extract_text(body):
+    # Returns ' ' rather than an empty string if there's no text.
+    # Raises ValueError for strings lxml can't parse, e.g. those with
+    # an XML encoding declaration.
+    if not body or body == "\n":
+        return ' '
+
+    if isinstance(body, str) and not __has_markup(body):
+        return normalise_text(body)
+
+    return tree_text(parse_html(body))
+
+
+def parse_html(body):
+    # Returns None if the document is empty, e.g. only whitespace
+    return etree.HTML(body)
+
+
+def tree_text(tree):
+    if tree is None:
+        return ' '
+
+    return normalise_text(' '.join(__text_nodes()(tree)))
+
+
+def is_html(text, tree):
+    # Whether text, parsed into tree by parse_html, has nested
+    # elements. This gives the same answer as
+    # lxml.html.fromstring(text).find('.//*') is not None, which
+    # unwraps a single element fragment before looking for elements
+    # in it, without parsing text again.
+    if tree is None:
+        return False
+
+    if __full_html.match(text) or tree.find('head') is not None:
+        return tree.find('.//*') is not None
+
+    body = tree.find('body')
+    if body is None:
+        return tree.find('.//*') is not None
+
+    if len(body) == 1 and not (body.text or '').strip() and not (body[0].tail or '').strip():
+        return body[0].find('.//*') is not None
+
+    return body.find('.//*') is not None
+
+
+def normalise_text(text):
+    return ' '.join(text.lower().replace(',', ' ').split()) or ' '
+
+# PRIVATE
+
+def __has_markup(text):
+    return '<' in text or '&' in text or '\x00' in text or text.startswith('\ufeff')
+
+
+def __text_nodes():
+    # Compiled XPath expressions can't be shared between threads
+    if not hasattr(__local, 'text_nodes'):
+        __local.text_nodes = etree.XPath('//text()', smart_strings=False)
+    return __local.text_nodes
@@ -0,0 +1,164 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+# An on-disk cache of HTTP responses, used by lib.session so that
+# re-running the exporter or the cleaning scripts doesn't download the
+# same content again.
+#
+# Responses are stored in SQLite keyed by URL, along with their ETag
+# and Last-Modified headers, so a cached response can be revalidated
+# with a conditional request. Entries younger than max_age seconds are
+# served without revalidating. When the cache grows past max_bytes the
+# least recently used entries are evicted.
+#
+# The cache lives in $DATADIR/http_cache.sqlite, and is only used if
+# DATADIR is set. Set HTTP_CACHE_BYPASS=1 to skip it.
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class CachedResponse():
+    def __init__(self, body, headers, stored_at):
+        self.body = body
+        self.headers = headers
+        self.stored_at = stored_at
+
+    @property
+    def validators(self):
+        validators = {}
+        if 'ETag' in self.headers:
+            validators['If-None-Match'] = self.headers['ETag']
+        if 'Last-Modified' in self.headers:
+            validators['If-Modified-Since'] = self.headers['Last-Modified']
+        return validators
+
+    def fresh(self, max_age):
+        return time.time() - self.stored_at < max_age
+
+
+class ResponseCache():
+    def __init__(self, filename, max_bytes=DEFAULT_MAX_BYTES, max_age=0):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'url TEXT PRIMARY KEY, body BLOB, headers TEXT, size INTEGER, '
+            'stored_at REAL, accessed_at REAL)'
+        )
+        self.__connection.execute(
+            'CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)'
+        )
+        self.__size = self.__connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()[0]
+
+    def __len__(self):
+        with self.__lock:
+            return self.__connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    @property
+    def size(self):
+        return self.__size
+
+    def get(self, url):
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT body, headers, stored_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self.__connection.execute(
+                'UPDATE responses SET accessed_at = ? WHERE url = ?', (time.time(), url)
+            )
+
+        body, headers, stored_at = row
+        return CachedResponse(zlib.decompress(body), json.loads(headers), stored_at)
+
+    def put(self, url, body, headers):
+        headers = {key: headers[key] for key in CACHED_HEADERS if key in headers}
+        compressed_body = zlib.compress(body)
+        now = time.time()
+
+        with self.__lock:
+            self.__delete(url)
+            self.__connection.execute(
+                'INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (url, compressed_body, json.dumps(headers), len(compressed_body), now, now)
+            )
+            self.__size += len(compressed_body)
+
+            if self.__size > self.max_bytes:
+                self.__evict()
+
+    def touch(self, url):
+        with self.__lock:
+            now = time.time()
+            self.__connection.execute(
+                'UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?', (now, now, url)
+            )
+
+    def close(self):
+        self.__connection.close()
+
+    # PRIVATE
+
+    def __delete(self, url):
+        row = self.__connection.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+        if row is not None:
+            self.__connection.execute('DELETE FROM responses WHERE url = ?', (url,))
+            self.__size -= row[0]
+
+    def __evict(self):
+        # Evict down to 90% of max_bytes, so that we don't evict on
+        # every put once the cache is full
+        target = 0.9 * self.max_bytes
+
+        while self.__size > target:
+            rows = self.__connection.execute(
+                'SELECT url, size FROM responses ORDER BY accessed_at LIMIT 1000'
+            ).fetchall()
+
+            if not rows:
+                break
+
+            for url, size in rows:
+                self.__connection.execute('DELETE FROM responses WHERE url = ?', (url,))
+                self.__size -= size
+                if self.__size <= target:
+                    break
+
+
+__default_cache = None
+__default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    global __default_cache
+
+    datadir = os.getenv('DATADIR')
+    if not datadir or os.getenv('HTTP_CACHE_BYPASS'):
+        return None
+
+    with __default_cache_lock:
+        if __default_cache is None:
+            __default_cache = ResponseCache(
+                os.path.join(datadir, 'http_cache.sqlite'),
+                max_bytes=int(os.getenv('HTTP_CACHE_MAX_BYTES') or DEFAULT_MAX_BYTES),
+                max_age=int(os.getenv('HTTP_CACHE_MAX_AGE') or 0),
+            )
+
+    return __default_cache
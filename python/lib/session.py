@@ -0,0 +1,186 @@
+from collections import Counter
+from urllib.parse import urlparse
+from lib import http_cache
+from lib.helpers import merge
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
+import requests
+import threading
+import time
+
+
+# Shared HTTP sessions for talking to the GOV.UK APIs.
+#
+# Connections are kept alive and pooled per host, so a long export
+# doesn't pay for a fresh TCP/TLS handshake on every request. Failed
+# requests are retried with exponential backoff, and requests can be
+# rate limited per host so we don't hammer the Content Store. Every
+# request is timed and its body size counted, so we can see how much
+# of an export is spent on the network. GET responses are cached on
+# disk, see lib.http_cache.
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HostRateLimiter():
+    def __init__(self, requests_per_second=None):
+        self.requests_per_second = requests_per_second
+        self.__lock = threading.Lock()
+        self.__next_request_at = {}
+
+    def wait(self, url):
+        if not self.requests_per_second:
+            return
+
+        host = urlparse(url).netloc
+        interval = 1.0 / self.requests_per_second
+
+        with self.__lock:
+            now = time.monotonic()
+            request_at = max(now, self.__next_request_at.get(host, now))
+            self.__next_request_at[host] = request_at + interval
+
+        delay = request_at - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RequestStats():
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.requests = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_url = None
+        self.status_codes = Counter()
+        self.cache_hits = 0
+
+    def record(self, url, status_code, byte_count, seconds):
+        with self.__lock:
+            self.requests += 1
+            self.bytes += byte_count
+            self.seconds += seconds
+            self.status_codes[status_code] += 1
+            if seconds > self.slowest_seconds:
+                self.slowest_seconds = seconds
+                self.slowest_url = url
+
+    def record_cache_hit(self):
+        with self.__lock:
+            self.cache_hits += 1
+
+    def summary(self):
+        mean_ms = (1000 * self.seconds / self.requests) if self.requests else 0
+        return "{} requests, {:.1f} MB in {:.1f}s of network time " \
+               "(mean {:.0f}ms, slowest {:.0f}ms {}), status codes: {}, " \
+               "{} served from the cache".format(
+                   self.requests,
+                   self.bytes / 1e6,
+                   self.seconds,
+                   mean_ms,
+                   1000 * self.slowest_seconds,
+                   self.slowest_url,
+                   dict(self.status_codes),
+                   self.cache_hits
+               )
+
+
+class PooledSession(requests.Session):
+    def __init__(self, rate_limiter=None, stats=None, cache=None):
+        super().__init__()
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.stats = stats or RequestStats()
+        self.cache = cache
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if self.cache is None or method.upper() != 'GET':
+            return self.__request(method, url, params=params, headers=headers, **kwargs)
+
+        cache_key = requests.Request(method, url, params=params).prepare().url
+        cached = self.cache.get(cache_key)
+
+        if cached is not None and cached.fresh(self.cache.max_age):
+            self.stats.record_cache_hit()
+            return self.__cached_response(cache_key, cached)
+
+        validators = cached.validators if cached is not None else {}
+        response = self.__request(method, url,
+                                  params=params,
+                                  headers=merge(headers or {}, validators),
+                                  **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(cache_key)
+            self.stats.record_cache_hit()
+            return self.__cached_response(cache_key, cached)
+
+        if response.status_code == 200 and \
+                ('ETag' in response.headers or 'Last-Modified' in response.headers or self.cache.max_age):
+            self.cache.put(cache_key, response.content, response.headers)
+
+        return response
+
+    # PRIVATE
+
+    def __request(self, method, url, **kwargs):
+        self.rate_limiter.wait(url)
+
+        started_at = time.monotonic()
+        response = super().request(method, url, **kwargs)
+        seconds = time.monotonic() - started_at
+
+        self.stats.record(url, response.status_code, len(response.content), seconds)
+        return response
+
+    @staticmethod
+    def __cached_response(url, cached):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(cached.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = cached.body
+        return response
+
+
+def pooled_session(pool_size=10,
+                   retries=3,
+                   backoff_factor=0.5,
+                   requests_per_second=None,
+                   cache=None,
+                   bypass_cache=False):
+    retry = Retry(total=retries,
+                  backoff_factor=backoff_factor,
+                  status_forcelist=RETRY_STATUSES,
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          max_retries=retry)
+
+    if bypass_cache:
+        cache = None
+    elif cache is None:
+        cache = http_cache.default_cache()
+
+    session = PooledSession(rate_limiter=HostRateLimiter(requests_per_second), cache=cache)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+__default_session = None
+__default_session_lock = threading.Lock()
+
+
+def default_session():
+    # A shared session for code that doesn't need its own pool
+    global __default_session
+
+    with __default_session_lock:
+        if __default_session is None:
+            __default_session = pooled_session()
+
+    return __default_session
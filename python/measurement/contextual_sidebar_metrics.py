@@ -1,20 +1,22 @@
-import gzip
-import ijson
 import progressbar
 from collections import defaultdict
-from lib.helpers import dig
+from lib.helpers import compile_path
 from lib import services
 from data_extraction.export_data import jenkins_compatible_progress_bar
-from data import items_from_content_file
+from data import items_from_content_file, map_items
 
-def contextual_sidebar_metrics():
+def contextual_sidebar_metrics(filename="content.json.gz", workers=1):
     progress_bar = jenkins_compatible_progress_bar()
-    content_items = items_from_content_file()
+
+    if workers > 1:
+        nav_types = map_items(navigation_type, filename=filename, workers=workers)
+    else:
+        nav_types = map(navigation_type, items_from_content_file(filename=filename))
 
     nav_type_count = defaultdict(int)
 
-    for content_item in progress_bar(content_items):
-        nav_type_count[navigation_type(content_item)] += 1
+    for nav_type in progress_bar(nav_types):
+        nav_type_count[nav_type] += 1
 
     for nav_type, count in nav_type_count.items():
         services.statsd.gauge('contextual_navigation.nav_type.' + nav_type, count)
@@ -23,17 +25,22 @@ def contextual_sidebar_metrics():
     related_navigation_count = sum(nav_type_count[type] for type in ('mainstream', 'curated', 'default'))
     services.statsd.gauge('contextual_navigation.related_navigation_count', related_navigation_count)
 
+__mainstream_browse_pages = compile_path('links', 'mainstream_browse_pages')
+__ordered_related_items = compile_path('links', 'ordered_related_items')
+__part_of_step_navs = compile_path('links', 'part_of_step_navs')
+__taxons = compile_path('links', 'taxons')
+
 def navigation_type(content_item):
-    mainstream_tags = dig(content_item, 'links', 'mainstream_browse_pages') or []
-    curated_items = dig(content_item, 'links', 'ordered_related_items') or []
+    mainstream_tags = __mainstream_browse_pages(content_item) or []
+    curated_items = __ordered_related_items(content_item) or []
 
-    step_by_step = dig(content_item, 'links', 'part_of_step_navs') or []
+    step_by_step = __part_of_step_navs(content_item) or []
     if len(step_by_step) != 1:
         step_by_step = None
 
     live_taxons = any(
         taxon.get('phase') == 'live'
-        for taxon in dig(content_item, 'links', 'taxons') or []
+        for taxon in __taxons(content_item) or []
     )
 
     if step_by_step:
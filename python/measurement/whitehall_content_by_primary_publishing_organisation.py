@@ -6,7 +6,7 @@ import data.organisations
 import progressbar
 from collections import defaultdict
 
-from lib.helpers import dig
+from lib.helpers import compile_path
 
 import pathlib
 
@@ -137,11 +137,18 @@ class Taxon:
         return False
 
 
+__parent_taxon = compile_path("links", "parent_taxons", 0)
+__root_taxon = compile_path("links", "root_taxon", 0)
+__taxons = compile_path("links", "taxons")
+__primary_publishing_organisation = compile_path("links", "primary_publishing_organisation", 0)
+__organisations = compile_path("links", "organisations")
+
+
 def get_taxons_and_parents_from_links(content_item):
     def get_taxon_parents(content_item):
         parent = (
-            dig(content_item, "links", "parent_taxons", 0) or
-            dig(content_item, "links", "root_taxon", 0)
+            __parent_taxon(content_item) or
+            __root_taxon(content_item)
         )
 
         if parent is None:
@@ -149,7 +156,7 @@ def get_taxons_and_parents_from_links(content_item):
 
         return [parent] + get_taxon_parents(parent)
 
-    taxons = dig(content_item, "links", "taxons") or []
+    taxons = __taxons(content_item) or []
 
     return [
         [taxon] + get_taxon_parents(taxon)
@@ -160,21 +167,12 @@ def get_taxons_and_parents_from_links(content_item):
 def extract_related_organisations(content_item):
     organisations = set()
 
-    primary_publishing_organisation = dig(
-        content_item,
-        "links",
-        "primary_publishing_organisation",
-        0,
-    )
+    primary_publishing_organisation = __primary_publishing_organisation(content_item)
 
     if primary_publishing_organisation:
         organisations.add(primary_publishing_organisation["content_id"])
 
-    organisation_items = dig(
-        content_item,
-        "links",
-        "organisations",
-    )
+    organisation_items = __organisations(content_item)
 
     if organisation_items:
         organisations.update(
@@ -0,0 +1,91 @@
+# coding: utf-8
+
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import yaml
+from scipy import sparse
+
+# One-hot encodes the categorical metadata of content items, e.g.
+# document_type, into a sparse matrix, with a block of columns for
+# each variable. The columns of a block are the values of the variable
+# in metadata_lists.yaml, sorted, as LabelEncoder numbers them.
+#
+# An encoder is fitted once, from metadata_lists.yaml, and can be
+# pickled, so new content is encoded with the same columns as the
+# content the model was trained on.
+
+# The variables that can be encoded, in the order of their blocks
+CATEGORICAL_VARIABLES = ('document_type', 'primary_publishing_organisation', 'publishing_app')
+
+# Items without a primary publishing organisation have an empty one
+EMPTY_VALUE_VARIABLES = ('primary_publishing_organisation',)
+
+
+class MetadataEncoder():
+    def __init__(self, metadata_lists, variables):
+        # Any variables other than CATEGORICAL_VARIABLES are ignored
+        self.variables = [variable for variable in CATEGORICAL_VARIABLES if variable in variables]
+        self.classes = OrderedDict()
+        self.widths = OrderedDict()
+
+        for variable in self.variables:
+            values = list(metadata_lists[variable])
+            if variable in EMPTY_VALUE_VARIABLES:
+                values.append('')
+
+            self.classes[variable] = sorted(set(values))
+            self.widths[variable] = len(values)
+
+    @classmethod
+    def from_file(cls, filename, variables):
+        with open(filename, 'r') as infile:
+            return cls(yaml.safe_load(infile), variables)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as infile:
+            return pickle.load(infile)
+
+    def save(self, filename):
+        with open(filename, 'wb') as outfile:
+            pickle.dump(self, outfile)
+
+    @property
+    def width(self):
+        return sum(self.widths.values())
+
+    def transform(self, metadata):
+        # metadata has a column for each variable, and a row for each
+        # content item. Missing values are encoded as empty strings.
+        # Each row of the matrix has a single 1 in each block.
+        columns = np.empty((len(metadata), len(self.variables)), dtype=np.int32)
+        offset = 0
+
+        for i, variable in enumerate(self.variables):
+            values = np.asarray(metadata[variable].fillna(''), dtype=object)
+            codes = pd.Index(self.classes[variable]).get_indexer(values)
+
+            if (codes < 0).any():
+                unknown = sorted(set(values[codes < 0]))
+                raise ValueError("Unknown values of {}: {}".format(variable, unknown))
+
+            columns[:, i] = codes + offset
+            offset += self.widths[variable]
+
+        return sparse.csr_matrix(
+            (
+                np.ones(columns.size, dtype=np.float64),
+                columns.ravel(),
+                np.arange(len(metadata) + 1) * len(self.variables)
+            ),
+            shape=(len(metadata), self.width)
+        )
+
+    def transform_content(self, content_ids, content):
+        # Encodes the metadata of the content items with content_ids,
+        # taken from the last row in content with the same content_id
+        metadata = content.drop_duplicates('content_id', keep='last').set_index('content_id')
+        return self.transform(metadata.reindex(pd.Index(content_ids))[self.variables])
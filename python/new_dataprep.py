@@ -54,7 +54,11 @@ if __name__ == "__main__":
     # ************************************
 
     logger.info("Vectorizing metadata")
-    meta = dataprep.create_meta(new_content['content_id'], new_content)
+    meta = dataprep.create_meta(
+        new_content['content_id'],
+        new_content,
+        encoder=dataprep.load_metadata_encoder()
+    )
 
     # **** TOKENIZE TEXT ********************
     # ************************************
@@ -74,7 +78,7 @@ if __name__ == "__main__":
     logger.info('One-hot encoding title sequences')
 
     title_onehot = dataprep.create_one_hot_matrix_for_column(
-        tokenizing.load_tokenizer_from_file(
+        tokenizing.load_word_index(
             os.path.join(DATADIR, "title_tokenizer.json")
         ),
         new_content['title'],
@@ -86,7 +90,7 @@ if __name__ == "__main__":
     logger.info('One-hot encoding description sequences')
 
     description_onehot = dataprep.create_one_hot_matrix_for_column(
-        tokenizing.load_tokenizer_from_file(
+        tokenizing.load_word_index(
             os.path.join(DATADIR, "description_tokenizer.json")
         ),
         new_content['description'],
@@ -5,11 +5,7 @@ import os.path
 import functools
 import pandas as pd
 import numpy as np
-from lxml import etree
-import json
-from collections import OrderedDict
-from pandas.io.json import json_normalize
-from lxml import html
+from lib import html_text
 
 
 
@@ -84,22 +80,11 @@ def extract_text(body):
 
     :param body: <str> containing html.
     """
-    #TODO: Tidy this up!
-    r = None
-    if body and body!="\n":
-        try:
-            tree = etree.HTML(body)
-            r = tree.xpath('//text()')
-            r = ' '.join(r)
-            r = r.strip().replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-            r = r.replace('\n', ' ').replace(',', ' ')
-            r = r.lower()
-            r = ' '.join(r.split())
-        except ValueError:
-            print("exception @ extract:",type(body),body)
-    if not r:
-        r = ' '
-    return r
+    try:
+        return html_text.extract_text(body)
+    except ValueError:
+        print("exception @ extract:",type(body),body)
+        return ' '
 
 def map_content_id_to_taxon_id(content_item):
     return [
@@ -126,28 +111,26 @@ filtered = ['body', 'brand', 'documents', 'final_outcome_detail', 'final_outcome
 
 def get_text(x):
     """
-From dict to json and back (to OrderedDict), iterate over json from details column (based on list filtered, should
-reconsider) and extract plaintext from included html.
+Iterate over the details dict (based on list filtered, should reconsider), in key order, and extract plaintext
+from included html.
     :param x: details cell from dataset
     :return: plaintext
     """
     total_text = ""
-    string_json = json.dumps(OrderedDict(x))
-    order_json = json.loads(string_json, object_pairs_hook=OrderedDict)
-    for key, raw_text in sorted(order_json.items()):
+    for key in sorted(x):
         if key in filtered:
+            raw_text = x[key]
             if isinstance(raw_text, str) and len(raw_text) > 1:
                 raw_text = raw_text.replace("-", " ")
-                raw_token = raw_text.split(" ")
-                if len(raw_token) > 0:
-                    raw_string = extract_text(raw_text)
-                    total_text += " " + raw_string
+                raw_string = extract_text(raw_text)
+                total_text += " " + raw_string
             elif isinstance(raw_text, list) and len(raw_text) > 0:
                 for sub_text in raw_text:
-                    if is_json(sub_text):
+                    kind, tree = classify(sub_text)
+                    if kind == 'json':
                         total_text += nested_extract(sub_text)
-                    elif is_html(sub_text):
-                        str_from_html = extract_text(sub_text)
+                    elif kind == 'html':
+                        str_from_html = html_text.tree_text(tree)
                         total_text += " " + str_from_html
     return total_text.strip()
 
@@ -159,26 +142,47 @@ Iterate over nested json (avoiding recursion), flattening loops.
     :return: plaintext
     """
     ttext = ""
-    string_json2 = json.dumps(OrderedDict(x))
-    order_json2 = json.loads(string_json2, object_pairs_hook=OrderedDict)
-    if ('body' or 'title') in order_json2.keys():
+    if 'body' in x:
         for item in look:
-            raw_string2 = extract_text(order_json2[item])
+            raw_string2 = extract_text(x[item])
             if len(raw_string2.split()) > 1:
                 ttext += " " + raw_string2
-    elif 'child_sections' in order_json2.keys():
-        for child in order_json2['child_sections']:
+    elif 'child_sections' in x:
+        for child in x['child_sections']:
             for key in child_keys:
                 ttext += " " + child[key]
     return ttext
 
+def classify(sub_text):
+    """
+Classify an element of a list in `details` as 'json' (nested details, handled by nested_extract), 'html' or 'text',
+without building DataFrames. HTML is returned with its parsed tree, so that the text can be extracted without
+parsing it again.
+    :param sub_text: element of a list in `details`
+    :return: (kind, tree), where tree is None unless kind is 'html'
+    """
+    if is_json(sub_text):
+        return 'json', None
+
+    text = str(sub_text)
+    tree = html_text.parse_html(text)
+    if html_text.is_html(text, tree):
+        return 'html', tree
+
+    return 'text', None
+
+
 def is_json(raw_text):
-    try:
-        json_normalize(raw_text).columns.tolist()
-    except AttributeError:
-        return False
-    return True
+    # json_normalize, which this used to call, only succeeded for
+    # dicts, and for lists whose elements are all dicts, including
+    # empty lists
+    if isinstance(raw_text, dict):
+        return True
+    if isinstance(raw_text, list):
+        return all(isinstance(element, dict) for element in raw_text)
+    return False
 
 
 def is_html(raw_text):
-    return html.fromstring(str(raw_text)).find('.//*') is not None
+    text = str(raw_text)
+    return html_text.is_html(text, html_text.parse_html(text))
@@ -0,0 +1,68 @@
+import unittest
+import os
+import tempfile
+
+from data import columnar
+from data import snapshot
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+ITEMS = [
+    {
+        "base_path": "/first",
+        "content_id": "a",
+        "title": "First",
+        "details": {"body": "<p>Body</p>", "parts": [{"slug": "one"}]},
+        "taxons": [{"title": "Taxon", "content_id": "t"}],
+        "primary_publishing_organisation": {"title": "Organisation"},
+    },
+    {
+        "base_path": "/second",
+        "content_id": "b",
+        "title": "Second",
+    },
+]
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow isn't installed")
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, 'filtered_content.parquet')
+        self.schema = columnar.content_schema(
+            base_fields=['base_path', 'content_id', 'title', 'details'],
+            taxon_fields=['title', 'content_id'],
+            ppo_fields=['title'],
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_schema(self):
+        self.assertEqual(str(self.schema.field('taxons').type),
+                         'list<item: struct<title: string, content_id: string>>')
+        self.assertEqual(str(self.schema.field('primary_publishing_organisation').type),
+                         'struct<title: string>')
+
+    def test_round_trip(self):
+        snapshot.write_items(self.filename, iter(ITEMS), schema=self.schema)
+        self.assertListEqual(list(snapshot.read_items(self.filename)), ITEMS)
+
+    def test_batches(self):
+        items = [{"content_id": str(i)} for i in range(25)]
+        columnar.write_items(self.filename, iter(items), self.schema, batch_size=10)
+        self.assertListEqual(list(columnar.read_items(self.filename, batch_size=7)), items)
+
+    def test_read_columns(self):
+        snapshot.write_items(self.filename, iter(ITEMS), schema=self.schema)
+        dataframe = columnar.read_columns(self.filename, columns=['content_id', 'title'])
+
+        self.assertListEqual(list(dataframe.columns), ['content_id', 'title'])
+        self.assertListEqual(list(dataframe['title']), ['First', 'Second'])
+
+    def test_schema_required(self):
+        with self.assertRaises(ValueError):
+            snapshot.write_items(self.filename, iter(ITEMS))
@@ -0,0 +1,47 @@
+import unittest
+import decimal
+import io
+import json
+import ijson
+
+from data.json import stream_json, json_encoder
+
+ITEMS = [
+    {"b": 1, "a": {"d": [1, 2], "c": "/path"}},
+    {"title": "Café", "number": decimal.Decimal('1.5')},
+    {},
+]
+
+
+class TestStreamJson(unittest.TestCase):
+    def stream(self, items, **kwargs):
+        output = io.StringIO()
+        stream_json(output, iter(items), **kwargs)
+        return output.getvalue()
+
+    def test_pretty(self):
+        output = self.stream(ITEMS[:1])
+        self.assertEqual(output, json.dumps(ITEMS[:1], indent=4, sort_keys=True))
+
+    def test_compact(self):
+        for chunk_size in (1, 2, 1000):
+            output = self.stream(ITEMS, compact=True, chunk_size=chunk_size)
+            self.assertEqual(json.loads(output), json.loads(json.dumps(ITEMS, default=float)))
+            self.assertEqual(len(output.splitlines()), len(ITEMS) + 2)
+
+    def test_compact_readable_by_ijson(self):
+        output = self.stream(ITEMS, compact=True, encoder='auto')
+        self.assertEqual(len(list(ijson.items(io.BytesIO(output.encode('utf-8')), prefix='item'))), len(ITEMS))
+
+    def test_compact_empty(self):
+        self.assertEqual(json.loads(self.stream([], compact=True)), [])
+
+    def test_compact_sort_keys(self):
+        output = self.stream(ITEMS[:1], compact=True, sort_keys=True)
+        self.assertEqual(output, '[\n{"a":{"c":"/path","d":[1,2]},"b":1}\n]')
+
+
+class TestJsonEncoder(unittest.TestCase):
+    def test_unknown_encoder(self):
+        with self.assertRaises(ValueError):
+            json_encoder('unknown')
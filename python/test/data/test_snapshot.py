@@ -0,0 +1,136 @@
+import unittest
+import gzip
+import json
+import operator
+import os
+import tempfile
+
+import data
+from data import snapshot
+
+ITEMS = [
+    {"content_id": "a", "title": "First", "links": {"taxons": [{"content_id": "t"}]}},
+    {"content_id": "b", "title": "Second\nline", "links": {}},
+]
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def round_trip(self, filename, **json_options):
+        full_filename = os.path.join(self.tmpdir.name, filename)
+        snapshot.write_items(full_filename, iter(ITEMS), **json_options)
+        return full_filename, list(snapshot.read_items(full_filename))
+
+    def test_json_gz(self):
+        filename, items = self.round_trip('content.json.gz')
+        self.assertListEqual(items, ITEMS)
+        with gzip.open(filename, 'rt') as f:
+            self.assertEqual(f.read(1), '[')
+
+    def test_json_lines_gz(self):
+        filename, items = self.round_trip('content.jsonl.gz', compact=True)
+        self.assertListEqual(items, ITEMS)
+        with gzip.open(filename, 'rt') as f:
+            self.assertEqual(len(f.readlines()), len(ITEMS))
+
+    def test_json_lines_uncompressed(self):
+        filename, items = self.round_trip('content.jsonl')
+        self.assertListEqual(items, ITEMS)
+
+    def test_json_lines_zstandard(self):
+        try:
+            import zstandard
+        except ImportError:
+            self.skipTest("zstandard isn't installed")
+
+        filename, items = self.round_trip('content.jsonl.zst')
+        self.assertListEqual(items, ITEMS)
+
+    def test_ijson_backends(self):
+        filename = os.path.join(self.tmpdir.name, 'content.json.gz')
+        snapshot.write_items(filename, iter(ITEMS))
+
+        for backend in snapshot.IJSON_BACKENDS:
+            try:
+                snapshot.ijson_backend((backend,))
+            except ImportError:
+                continue
+            self.assertListEqual(list(snapshot.read_items(filename, backends=(backend,))), ITEMS)
+
+    def test_no_ijson_backend(self):
+        with self.assertRaises(ImportError):
+            snapshot.ijson_backend(('missing',))
+
+    def test_content_file(self):
+        data.write_content_file('content.jsonl.gz', iter(ITEMS), datadir=self.tmpdir.name)
+        self.assertListEqual(
+            list(data.items_from_content_file(datadir=self.tmpdir.name, filename='content.jsonl.gz')),
+            ITEMS
+        )
+
+
+class TestShardedSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.items = [{"content_id": str(i), "links": {}} for i in range(25)]
+        self.filename = os.path.join(self.tmpdir.name, 'content.manifest.json')
+        snapshot.write_items(self.filename, iter(self.items), shard_size=10)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_manifest(self):
+        with open(self.filename) as f:
+            manifest = json.load(f)
+
+        self.assertEqual(manifest['count'], 25)
+        self.assertListEqual([part['count'] for part in manifest['parts']], [10, 10, 5])
+        parts = [os.path.basename(part) for part in snapshot.read_manifest(self.filename)]
+        self.assertEqual(len(parts), 3)
+        for index, part in enumerate(parts):
+            self.assertRegex(part, r'^content-[0-9a-f]{{8}}-{:05d}\.jsonl\.gz$'.format(index))
+
+    def test_rewrite_in_place(self):
+        # The parts being read aren't overwritten, and are removed once
+        # the new manifest replaces the old one
+        old_parts = snapshot.read_manifest(self.filename)
+        snapshot.write_items(self.filename, (dict(item, title='New') for item in snapshot.read_items(self.filename)),
+                             shard_size=10)
+
+        self.assertListEqual(list(snapshot.read_items(self.filename)),
+                             [dict(item, title='New') for item in self.items])
+        self.assertCountEqual(
+            os.listdir(self.tmpdir.name),
+            ['content.manifest.json'] + [os.path.basename(part) for part in snapshot.read_manifest(self.filename)]
+        )
+        self.assertFalse(set(old_parts) & set(snapshot.read_manifest(self.filename)))
+
+    def test_read_items(self):
+        self.assertListEqual(list(snapshot.read_items(self.filename)), self.items)
+
+    def test_map_items(self):
+        self.assertListEqual(
+            list(snapshot.map_items(operator.itemgetter('content_id'), self.filename, workers=2)),
+            [str(i) for i in range(25)]
+        )
+
+    def test_map_items_unsharded(self):
+        filename = os.path.join(self.tmpdir.name, 'content.json.gz')
+        snapshot.write_items(filename, iter(self.items))
+        self.assertListEqual(
+            list(snapshot.map_items(operator.itemgetter('content_id'), filename, workers=2, chunksize=3)),
+            [str(i) for i in range(25)]
+        )
+
+    def test_parallel_read_items(self):
+        self.assertListEqual(list(snapshot.parallel_read_items(self.filename, workers=2)), self.items)
+
+    def test_empty(self):
+        filename = os.path.join(self.tmpdir.name, 'empty.manifest.json')
+        snapshot.write_items(filename, iter([]))
+        self.assertListEqual(list(snapshot.read_items(filename)), [])
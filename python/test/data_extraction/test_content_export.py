@@ -29,6 +29,12 @@ class TestGetContent(unittest.TestCase):
         self.assertEquals(expected.get('base_path'), response.get('base_path'))
         self.assertEquals(expected.get('content_id'), response.get('content_id'))
 
+    @responses.activate
+    def test_single_request(self):
+        responses.add(responses.GET, "http://example.com/content/base_path", json=content_without_taxons)
+        content_export.get_content('/base_path', content_store_url="http://example.com")
+        self.assertEqual(len(responses.calls), 1)
+
     @responses.activate
     def test_taxons(self):
         responses.add(responses.GET, "http://example.com/content/base_path", json=content_with_taxons)
@@ -0,0 +1,29 @@
+import unittest
+from data_extraction.content_fetcher import ContentFetcher
+from test.data_extraction.content_store_helpers import *
+import responses
+
+
+class TestContentFetcher(unittest.TestCase):
+
+    @responses.activate
+    def test_get_content(self):
+        responses.add(responses.GET, "http://example.com/content/base_path", json=content_with_taxons)
+        fetcher = ContentFetcher(content_store_url="http://example.com")
+        self.assertDictEqual(fetcher.get_content('/base_path'), content_with_taxons)
+
+    @responses.activate
+    def test_get_content_404(self):
+        responses.add(responses.GET, "http://example.com/content/base_path", status=404)
+        fetcher = ContentFetcher(content_store_url="http://example.com", retries=0)
+        self.assertFalse(fetcher.get_content('/base_path'))
+
+    @responses.activate
+    def test_imap_preserves_order(self):
+        responses.add(responses.GET, "http://example.com/content/first/path", json=content_first)
+        responses.add(responses.GET, "http://example.com/content/second/path", json=content_second)
+        responses.add(responses.GET, "http://example.com/content/missing", status=404)
+
+        fetcher = ContentFetcher(content_store_url="http://example.com", concurrency=2, retries=0)
+        results = fetcher.imap(iter(['/second/path', '/missing', '/first/path'] * 3))
+        self.assertListEqual(list(results), [content_second, False, content_first] * 3)
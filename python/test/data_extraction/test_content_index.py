@@ -0,0 +1,54 @@
+import unittest
+import os
+import tempfile
+from data_extraction.content_index import ContentIndex, index_filename
+from test.data_extraction.content_store_helpers import *
+
+
+class TestContentIndex(unittest.TestCase):
+    def test_index_filename(self):
+        self.assertEqual(index_filename('data/content.json.gz'), 'data/content.index.json.gz')
+
+    def test_unchanged(self):
+        index = ContentIndex()
+        index.add(content_first)
+
+        self.assertTrue(index.unchanged(dict(content_first)))
+        self.assertFalse(index.unchanged(dict(content_first, title="Changed")))
+        self.assertFalse(index.unchanged(content_second))
+
+    def test_updated(self):
+        index = ContentIndex()
+        index.add(content_first)
+
+        self.assertFalse(index.updated(dict(content_first, title="Changed")))
+        self.assertTrue(index.updated(dict(content_first, updated_at='2018-02-01T00:00:00Z')))
+        self.assertFalse(index.updated(content_second))
+
+    def test_needs_full_export(self):
+        index = ContentIndex(watermark='2018-03-04T05:06:07Z', full_export_at='2018-03-01T05:06:07Z')
+
+        self.assertFalse(index.needs_full_export(7, at='2018-03-07T05:06:07Z'))
+        self.assertTrue(index.needs_full_export(7, at='2018-03-08T05:06:07Z'))
+        self.assertTrue(ContentIndex(watermark='2018-03-04T05:06:07Z').needs_full_export(7))
+
+    def test_search_fields_since_watermark(self):
+        index = ContentIndex(watermark='2018-03-04T05:06:07Z')
+        self.assertDictEqual(index.search_fields_since_watermark(),
+                             {'filter_public_timestamp': 'from:2018-03-04'})
+
+    def test_save_and_load(self):
+        index = ContentIndex(watermark='2018-03-04T05:06:07Z', full_export_at='2018-03-01T05:06:07Z')
+        index.add(content_first)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'content.index.json.gz')
+            index.save(filename)
+            loaded = ContentIndex.load(filename)
+
+        self.assertEqual(loaded.watermark, index.watermark)
+        self.assertEqual(loaded.full_export_at, index.full_export_at)
+        self.assertDictEqual(loaded.items, index.items)
+
+    def test_load_missing(self):
+        self.assertIsNone(ContentIndex.load('/does/not/exist.index.json.gz').watermark)
@@ -1,10 +1,15 @@
 import unittest
 import unittest.mock
+from data import snapshot
 from data_extraction import export_data
 from test.data_extraction.content_store_helpers import *
 import responses
 import json
 import io
+import gzip
+import os
+import tempfile
+from data_extraction.content_index import ContentIndex, index_filename
 from test.lib.mock_io import MockIO
 
 class TestExportData(unittest.TestCase):
@@ -22,6 +27,22 @@ class TestExportData(unittest.TestCase):
                         {"parent_content_id": "aaaa", "base_path": "/root_taxon/taxon_2", "content_id": "aaaa_2222"}]
             self.assertEqual(expected, json.loads(output.buffer))
 
+    @responses.activate
+    def test_export_taxon_levels(self):
+        content_store_has_item('/taxons/root_taxon', multi_level_child_taxons)
+        content_store_has_item("/", json=level_one_taxons)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            levels_filename = os.path.join(tmpdir, 'taxon_levels.csv.gz')
+            export_data.export_taxons(output_filename=os.path.join(tmpdir, 'taxons.json.gz'),
+                                      taxon_levels_filename=levels_filename)
+
+            with gzip.open(levels_filename, 'rt') as f:
+                rows = f.read().splitlines()
+
+        self.assertEqual(rows[0], 'base_path,content_id,taxon_name,level1taxon,level2taxon,level3taxon,level4taxon,level5taxon')
+        self.assertListEqual([row.split(',')[1] for row in rows[1:]], ['rrrr', 'aaaa', 'aaaa_1111', 'aaaa_2222'])
+
     def return_input_or_output(self, input_io, output_io):
         return lambda *_, **ka: input_io if ka['mode'] == 'rt' else output_io
 
@@ -40,6 +61,123 @@ class TestExportData(unittest.TestCase):
             expected = [content_first, content_second]
             self.assertCountEqual(expected, json.loads(output.buffer))
 
+    @responses.activate
+    def test_export_content_duplicate_links(self):
+        output = MockIO()
+        responses.add(
+            responses.GET,
+            "{}/search.json".format(plek.find("search-api")),
+            json={'results': content_links['results'] * 2}
+        )
+        content_store_has_item(content_first['base_path'], json=content_first)
+        content_store_has_item(content_second['base_path'], json=content_second)
+        with unittest.mock.patch('gzip.open', return_value=output):
+            export_data.export_content()
+            self.assertCountEqual([content_first, content_second], json.loads(output.buffer))
+
+        self.assertEqual(len([call for call in responses.calls if '/content/' in call.request.url]), 2)
+
+    @responses.activate
+    def test_export_content_incremental(self):
+        updated_second = dict(content_second, title="Updated")
+        removed = dict(content_first, base_path='/removed/path', content_id='removed')
+
+        def search(request):
+            if 'filter_public_timestamp' in request.url:
+                return (200, {}, json.dumps({'results': [{'link': '/second/path'}]}))
+            return (200, {}, json.dumps(content_links))
+
+        responses.add_callback(responses.GET, "{}/search.json".format(plek.find("search-api")), callback=search)
+        content_store_has_item(content_second['base_path'], json=updated_second)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'content.json.gz')
+            with gzip.open(filename, 'wt') as f:
+                json.dump([content_first, content_second, removed], f)
+
+            index = ContentIndex(watermark='2018-01-01T00:00:00Z', full_export_at='2018-01-01T00:00:00Z')
+            for item in (content_first, content_second, removed):
+                index.add(item)
+            index.save(index_filename(filename))
+
+            export_data.export_content_incremental(previous_filename=filename,
+                                                   output_filename=filename,
+                                                   full_export_after_days=100000)
+
+            with gzip.open(filename, 'rt') as f:
+                self.assertListEqual(json.load(f), [content_first, updated_second])
+
+            new_index = ContentIndex.load(index_filename(filename))
+            self.assertCountEqual(new_index.items.keys(), [content_first['content_id'], content_second['content_id']])
+            self.assertNotEqual(new_index.watermark, index.watermark)
+            self.assertEqual(new_index.full_export_at, index.full_export_at)
+
+        self.assertIn('filter_public_timestamp=from%3A2018-01-01', responses.calls[0].request.url)
+        self.assertEqual(len([call for call in responses.calls if '/content/' in call.request.url]), 1)
+
+    @responses.activate
+    def test_export_content_incremental_sharded(self):
+        updated_second = dict(content_second, title="Updated")
+
+        def search(request):
+            if 'filter_public_timestamp' in request.url:
+                return (200, {}, json.dumps({'results': [{'link': '/second/path'}]}))
+            return (200, {}, json.dumps(content_links))
+
+        responses.add_callback(responses.GET, "{}/search.json".format(plek.find("search-api")), callback=search)
+        content_store_has_item(content_second['base_path'], json=updated_second)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'content.manifest.json')
+            snapshot.write_sharded_items(filename, [content_first, content_second], shard_size=1)
+
+            index = ContentIndex(watermark='2018-01-01T00:00:00Z', full_export_at='2018-01-01T00:00:00Z')
+            index.add(content_first)
+            index.add(content_second)
+            index.save(index_filename(filename))
+
+            for _ in range(2):
+                export_data.export_content_incremental(previous_filename=filename,
+                                                       output_filename=filename,
+                                                       full_export_after_days=100000)
+
+            self.assertListEqual(list(snapshot.read_items(filename)), [content_first, updated_second])
+            self.assertCountEqual(
+                os.listdir(tmpdir),
+                ['content.manifest.json', os.path.basename(index_filename(filename))] +
+                [os.path.basename(part) for part in snapshot.read_manifest(filename)]
+            )
+
+    @responses.activate
+    def test_export_content_incremental_after_an_old_full_export(self):
+        retagged_first = dict(content_first, updated_at='2018-02-01T00:00:00Z')
+
+        responses.add(responses.GET, "{}/search.json".format(plek.find("search-api")), json=content_links)
+        content_store_has_item(content_first['base_path'], json=retagged_first)
+        content_store_has_item(content_second['base_path'], json=content_second)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'content.json.gz')
+            with gzip.open(filename, 'wt') as f:
+                json.dump([content_first, content_second], f)
+
+            index = ContentIndex(watermark='2018-01-08T00:00:00Z', full_export_at='2018-01-01T00:00:00Z')
+            index.add(content_first)
+            index.add(content_second)
+            index.save(index_filename(filename))
+
+            export_data.export_content_incremental(previous_filename=filename,
+                                                   output_filename=filename,
+                                                   full_export_after_days=7)
+
+            with gzip.open(filename, 'rt') as f:
+                self.assertCountEqual(json.load(f), [retagged_first, content_second])
+
+            new_index = ContentIndex.load(index_filename(filename))
+            self.assertEqual(new_index.full_export_at, new_index.watermark)
+
+        self.assertNotIn('filter_public_timestamp', responses.calls[0].request.url)
+
     def test_export_filtered_content(self):
         input_string = json.dumps([content_with_taxons, content_without_taxons])
         output = MockIO()
@@ -53,6 +191,54 @@ class TestExportData(unittest.TestCase):
                          "content_id": content_without_taxons["content_id"]}]
             self.assertEqual(expected, json.loads(output.buffer))
 
+    def test_export_filtered_content_parquet(self):
+        try:
+            import pyarrow
+        except ImportError:
+            self.skipTest("pyarrow isn't installed")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_filename = os.path.join(tmpdir, 'content.json.gz')
+            output_filename = os.path.join(tmpdir, 'filtered_content.parquet')
+
+            with gzip.open(input_filename, 'wt') as f:
+                json.dump([content_with_taxons, content_with_ppo], f)
+
+            export_data.export_filtered_content(input_filename=input_filename, output_filename=output_filename)
+
+            expected = [{"taxons": [{"title": None, "content_id": taxon["content_id"]}
+                                    for taxon in content_with_taxons['links']['taxons']],
+                         "base_path": content_with_taxons['base_path'],
+                         "content_id": content_with_taxons["content_id"]},
+                        {"primary_publishing_organisation": {"title": "title1"},
+                         "base_path": content_with_ppo['base_path'],
+                         "content_id": content_with_ppo["content_id"]}]
+            self.assertListEqual(expected, list(snapshot.read_items(output_filename)))
+
+    def test_export_filtered_and_untagged_content(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_filename = os.path.join(tmpdir, 'content.json.gz')
+            filtered_filename = os.path.join(tmpdir, 'filtered_content.json.gz')
+            untagged_filename = os.path.join(tmpdir, 'untagged_content.json.gz')
+
+            with gzip.open(input_filename, 'wt') as f:
+                json.dump([content_with_taxons, content_without_taxons], f)
+
+            with unittest.mock.patch('data.snapshot.read_items', wraps=snapshot.read_items) as read_items:
+                export_data.export_filtered_and_untagged_content(input_filename=input_filename,
+                                                                 filtered_filename=filtered_filename,
+                                                                 untagged_filename=untagged_filename)
+                self.assertEqual(read_items.call_count, 1)
+
+            with gzip.open(filtered_filename, 'rt') as f:
+                self.assertListEqual(
+                    [item['base_path'] for item in json.load(f)],
+                    [content_with_taxons['base_path'], content_without_taxons['base_path']]
+                )
+
+            with gzip.open(untagged_filename, 'rt') as f:
+                self.assertEqual(len(json.load(f)), 1)
+
     def export_untagged_content(self):
         output = MockIO()
         input_string = json.dumps([content_with_taxons, content_without_taxons])
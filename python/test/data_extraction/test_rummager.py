@@ -18,3 +18,24 @@ class TestRummager(unittest.TestCase):
         search_results = [{'title': 't1'}, {'title': 't2'}, {'title': 't3'}]
         results = rummager.Rummager("http://example.com").search_generator({}, 2)
         self.assertListEqual(search_results, list(results))
+
+    @responses.activate
+    def test_parallel_search_generator(self):
+        stub_rummager({'results': [{'title': 't1'}, {'title': 't2'}], 'total': 5}, 0, 2)
+        stub_rummager({'results': [{'title': 't3'}, {'title': 't4'}], 'total': 5}, 2, 2)
+        stub_rummager({'results': [{'title': 't5'}], 'total': 5}, 4, 2)
+
+        search_results = [{'title': 't1'}, {'title': 't2'}, {'title': 't3'}, {'title': 't4'}, {'title': 't5'}]
+        results = rummager.Rummager("http://example.com").search_generator({}, 2, concurrency=3)
+        self.assertListEqual(search_results, list(results))
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_parallel_search_generator_results_added(self):
+        stub_rummager({'results': [{'title': 't1'}, {'title': 't2'}], 'total': 3}, 0, 2)
+        stub_rummager({'results': [{'title': 't3'}, {'title': 't4'}], 'total': 5}, 2, 2)
+        stub_rummager({'results': [{'title': 't5'}], 'total': 5}, 4, 2)
+
+        search_results = [{'title': 't1'}, {'title': 't2'}, {'title': 't3'}, {'title': 't4'}, {'title': 't5'}]
+        results = rummager.Rummager("http://example.com").search_generator({}, 2, concurrency=3)
+        self.assertListEqual(search_results, list(results))
@@ -61,3 +61,49 @@ class TaxonLinkedToRoot(unittest.TestCase):
         self.assertFalse(self.__connected(helpers.content_with_multiple_taxons['links']['taxons'][0]))
         self.assertTrue(self.__connected(helpers.content_with_multiple_taxons['links']['taxons'][1]))
 
+    def test_memoised(self):
+        query = taxonomy_query.TaxonomyQuery()
+        linked_taxon = helpers.content_with_multiple_taxons['links']['taxons'][1]
+        parent_taxon = linked_taxon['links']['parent_taxons'][0]
+
+        self.assertTrue(query.taxon_linked_to_root(linked_taxon))
+        self.assertTrue(query.taxon_linked_to_root({"content_id": linked_taxon['content_id'], "links": {}}))
+        self.assertTrue(query.taxon_linked_to_root({"content_id": parent_taxon['content_id'], "links": {}}))
+        self.assertFalse(query.taxon_linked_to_root({"content_id": "unknown", "links": {}}))
+
+
+class Taxonomy(unittest.TestCase):
+
+    @responses.activate
+    def test_taxonomy(self):
+        helpers.content_store_has_item("/", json={"links": {"level_one_taxons": [
+            {"base_path": "/taxons/root_taxon", "content_id": "rrrr", "title": "Root"},
+            {"base_path": "/taxons/other", "content_id": "oooo", "title": "Other"}
+        ]}})
+        helpers.content_store_has_item('/taxons/root_taxon', helpers.multi_level_child_taxons)
+        helpers.content_store_has_item('/taxons/other', helpers.single_level_child_taxons('oooo', 'bbbb', 'cccc'))
+
+        taxons, table = taxonomy_query.TaxonomyQuery(["content_id"]).taxonomy()
+
+        self.assertListEqual(taxons, [{'content_id': 'rrrr'},
+                                      {'content_id': 'oooo'},
+                                      {'content_id': 'aaaa', 'parent_content_id': 'rrrr'},
+                                      {'content_id': 'aaaa_1111', 'parent_content_id': 'aaaa'},
+                                      {'content_id': 'aaaa_2222', 'parent_content_id': 'aaaa'},
+                                      {'content_id': 'bbbb', 'parent_content_id': 'oooo'},
+                                      {'content_id': 'cccc', 'parent_content_id': 'oooo'}])
+
+        self.assertDictEqual(table[0], {'base_path': '/taxons/root_taxon', 'content_id': 'rrrr', 'taxon_name': 'Root',
+                                        'level1taxon': 'Root', 'level2taxon': None, 'level3taxon': None,
+                                        'level4taxon': None, 'level5taxon': None})
+        self.assertListEqual([row['content_id'] for row in table], [taxon['content_id'] for taxon in taxons])
+        self.assertListEqual([row['level1taxon'] for row in table], ['Root', 'Other', 'Root', 'Root', 'Root', 'Other', 'Other'])
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_content_dicts_memoised(self):
+        helpers.content_store_has_item('/taxons/root_taxon', helpers.multi_level_child_taxons)
+        query = taxonomy_query.TaxonomyQuery()
+        query.child_taxons('/taxons/root_taxon')
+        query.child_taxons('/taxons/root_taxon')
+        self.assertEqual(len(responses.calls), 1)
@@ -0,0 +1,55 @@
+import unittest
+import time
+from concurrent.futures import ProcessPoolExecutor
+from lib.concurrency import imap_ordered, fan_out
+
+
+class TestImapOrdered(unittest.TestCase):
+    def test_preserves_order(self):
+        def slow_square(x):
+            time.sleep(0.01 * (5 - x))
+            return x * x
+
+        self.assertListEqual(list(imap_ordered(slow_square, iter(range(5)), concurrency=5)),
+                             [0, 1, 4, 9, 16])
+
+    def test_empty(self):
+        self.assertListEqual(list(imap_ordered(lambda x: x, [])), [])
+
+
+class TestFanOut(unittest.TestCase):
+    def test_every_consumer_gets_every_item(self):
+        read = []
+
+        def items():
+            for i in range(250):
+                read.append(i)
+                yield i
+
+        results = fan_out(items(), [sum, list, lambda items: max(items)], chunk_size=7, max_in_flight=2)
+
+        self.assertListEqual(results, [sum(range(250)), list(range(250)), 249])
+        self.assertListEqual(read, list(range(250)))
+
+    def test_consumer_stopping_early(self):
+        results = fan_out(iter(range(1000)), [lambda items: next(items), sum], chunk_size=10, max_in_flight=1)
+        self.assertListEqual(results, [0, sum(range(1000))])
+
+    def test_consumer_error(self):
+        def failing(items):
+            next(items)
+            raise ValueError("Failed")
+
+        with self.assertRaises(ValueError):
+            fan_out(iter(range(100000)), [failing, sum], chunk_size=10, max_in_flight=1)
+
+    def test_single_consumer(self):
+        self.assertListEqual(fan_out(iter(range(5)), [list]), [list(range(5))])
+
+
+class TestImapOrderedProcesses(unittest.TestCase):
+    def test_process_pool(self):
+        self.assertListEqual(
+            list(imap_ordered(abs, iter(range(-5, 5)), concurrency=2, executor_class=ProcessPoolExecutor)),
+            [5, 4, 3, 2, 1, 0, 1, 2, 3, 4]
+        )
@@ -1,5 +1,5 @@
 import unittest
-from lib.helpers import dig, slice, merge
+from lib.helpers import dig, slice, merge, compile_path, compile_slice
 
 
 class TestHelpers(unittest.TestCase):
@@ -24,5 +24,19 @@ class TestHelpers(unittest.TestCase):
     def test_dig_deep_array(self):
         self.assertEqual(dig({"a": {"b": [1, {'q': 'z'}, 3]}}, "a", "b", 1, 'q'), 'z')
 
+    def test_dig_type_mismatch(self):
+        self.assertEqual(dig({"a": "b"}, "a", 0), "b")
+        self.assertEqual(dig({"a": [1]}, "a", "b"), [1])
+
+    def test_compile_path(self):
+        content_item = {"a": {"b": [1, {'q': 'z'}, 3]}}
+        for key_list in (("a", "b", 1, "q"), ("a", "q", "b"), ("a", "b", 0, "q"), ("a",)):
+            self.assertEqual(compile_path(*key_list)(content_item), dig(content_item, *key_list))
+
+    def test_compile_slice(self):
+        slicer = compile_slice(["a", "c"])
+        self.assertEqual(slicer({"a": 1, "b": 2}), {"a": 1})
+        self.assertEqual(slicer({"a": 1, "b": 2, "c": None}), slice({"a": 1, "b": 2, "c": None}, ["a", "c"]))
+
     def test_merge(self):
         self.assertEqual(merge({"a": 1}, {"b": 2}), {"a": 1, "b": 2})
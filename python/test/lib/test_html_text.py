@@ -0,0 +1,57 @@
+import unittest
+from lib import html_text
+
+# Inputs and the text extracted from them by the original
+# pipeline_functions.extract_text, which built a tree with etree.HTML,
+# joined its //text() nodes and normalised them in several passes
+EXTRACTED_TEXT = [
+    ('', ' '),
+    ('\n', ' '),
+    ('Apply for a passport', 'apply for a passport'),
+    ('Tax, benefits and\tpensions\r\n', 'tax benefits and pensions'),
+    ('<h2 id="overview">Overview</h2>\n<p>You can <a href="/apply">apply online</a>, by post or in person.</p>',
+     'overview you can apply online by post or in person.'),
+    ('<p>Fish &amp; chips</p><p>Caf&eacute; &#44; bar</p>', 'fish & chips café bar'),
+    ('<ul><li>One</li><li>Two</li></ul>', 'one two'),
+    ('Before<!-- a comment -->After', 'before after'),
+    ('<script>var x = 1;</script><p>Text</p>', 'var x = 1; text'),
+    ('Costs &pound;50', 'costs £50'),
+    ('\ufeffByte order mark', 'byte order mark'),
+    ('Nul\x00terminated', 'nul\ufffdterminated'),
+    ('<div><p>Nested <strong>bold</strong>text</p></div>', 'nested bold text'),
+    ('3 < 4 and 5 > 4', '3 < 4 and 5 > 4'),
+    ('<table><tr><th>Name</th><td>Value, 1</td></tr></table>', 'name value 1'),
+    ('ÉCOLE İstanbul STRASSE', 'école i̇stanbul strasse'),
+]
+
+
+class TestHtmlText(unittest.TestCase):
+    def test_extract_text(self):
+        for body, expected in EXTRACTED_TEXT:
+            self.assertEqual(html_text.extract_text(body), expected, body)
+
+    def test_plain_text_matches_parsed(self):
+        for body, _ in EXTRACTED_TEXT:
+            if body.strip():
+                self.assertEqual(html_text.extract_text(body), html_text.tree_text(html_text.parse_html(body)), body)
+
+    def test_empty_document(self):
+        self.assertEqual(html_text.tree_text(html_text.parse_html('<!-- only a comment -->')), ' ')
+
+    def test_encoding_declaration(self):
+        with self.assertRaises(ValueError):
+            html_text.extract_text('<?xml version="1.0" encoding="utf-8"?><p>Text</p>')
+
+    def test_is_html(self):
+        # Single elements are unwrapped, as by lxml.html.fromstring, so
+        # only count as HTML if they have elements inside them
+        for text, expected in (
+                ('Plain text', False),
+                ('<p>One element</p>', False),
+                ('<p>Nested <b>element</b></p>', True),
+                ('<p>One</p><p>Two</p>', True),
+                ('Text <b>and</b> element', True),
+                ('Text<!-- and a comment -->', False),
+                ('<html><body>Document</body></html>', True),
+        ):
+            self.assertEqual(html_text.is_html(text, html_text.parse_html(text)), expected, text)
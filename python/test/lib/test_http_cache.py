@@ -0,0 +1,97 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from lib import http_cache
+from lib.http_cache import ResponseCache
+from lib.session import pooled_session
+import responses
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, 'http_cache.sqlite')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_put_and_get(self):
+        cache = ResponseCache(self.filename)
+        cache.put("http://example.com/a", b'{"a": 1}', {'ETag': '"abc"', 'Server': 'nginx'})
+
+        cached = cache.get("http://example.com/a")
+        self.assertEqual(cached.body, b'{"a": 1}')
+        self.assertDictEqual(cached.headers, {'ETag': '"abc"'})
+        self.assertDictEqual(cached.validators, {'If-None-Match': '"abc"'})
+        self.assertIsNone(cache.get("http://example.com/b"))
+
+    def test_persists(self):
+        ResponseCache(self.filename).put("http://example.com/a", b'a', {})
+        cache = ResponseCache(self.filename)
+        self.assertEqual(cache.get("http://example.com/a").body, b'a')
+        self.assertGreater(cache.size, 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(self.filename)
+        with patch('time.time', side_effect=range(100)):
+            cache.put("http://example.com/a", os.urandom(100), {})
+            cache.put("http://example.com/b", os.urandom(100), {})
+            cache.get("http://example.com/a")
+            cache.max_bytes = int(cache.size * 1.4)
+            cache.put("http://example.com/c", os.urandom(100), {})
+
+        self.assertIsNotNone(cache.get("http://example.com/a"))
+        self.assertIsNone(cache.get("http://example.com/b"))
+        self.assertIsNotNone(cache.get("http://example.com/c"))
+        self.assertEqual(len(cache), 2)
+
+    def test_default_cache_needs_datadir(self):
+        with patch.dict('os.environ', {}, clear=True):
+            self.assertIsNone(http_cache.default_cache())
+
+
+class TestCachedSession(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(os.path.join(self.tmpdir.name, 'http_cache.sqlite'))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @responses.activate
+    def test_revalidates(self):
+        responses.add(responses.GET, "http://example.com/a", json={"a": 1}, headers={'ETag': '"abc"'})
+        responses.add(responses.GET, "http://example.com/a", status=304)
+
+        session = pooled_session(cache=self.cache)
+        self.assertDictEqual(session.get("http://example.com/a").json(), {"a": 1})
+
+        response = session.get("http://example.com/a")
+        self.assertEqual(response.status_code, 200)
+        self.assertDictEqual(response.json(), {"a": 1})
+        self.assertEqual(responses.calls[1].request.headers['If-None-Match'], '"abc"')
+        self.assertEqual(session.stats.cache_hits, 1)
+
+    @responses.activate
+    def test_fresh_responses_not_revalidated(self):
+        responses.add(responses.GET, "http://example.com/search.json", json={"results": []})
+        self.cache.max_age = 60
+
+        session = pooled_session(cache=self.cache)
+        session.get("http://example.com/search.json", params={"start": 0})
+        session.get("http://example.com/search.json", params={"start": 0})
+        session.get("http://example.com/search.json", params={"start": 10})
+
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_bypass(self):
+        responses.add(responses.GET, "http://example.com/a", json={"a": 1}, headers={'ETag': '"abc"'})
+
+        session = pooled_session(cache=self.cache, bypass_cache=True)
+        session.get("http://example.com/a")
+        session.get("http://example.com/a")
+
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(len(self.cache), 0)
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+from lib.session import HostRateLimiter, RequestStats, pooled_session
+import responses
+
+
+class TestHostRateLimiter(unittest.TestCase):
+    def test_unlimited(self):
+        with patch('time.sleep') as sleep:
+            limiter = HostRateLimiter()
+            for _ in range(10):
+                limiter.wait("http://example.com/a")
+            sleep.assert_not_called()
+
+    def test_limited_per_host(self):
+        with patch('time.monotonic', return_value=100.0), patch('time.sleep') as sleep:
+            limiter = HostRateLimiter(requests_per_second=2)
+            limiter.wait("http://example.com/a")
+            limiter.wait("http://other.example.com/a")
+            sleep.assert_not_called()
+
+            limiter.wait("http://example.com/b")
+            sleep.assert_called_once_with(0.5)
+
+
+class TestRequestStats(unittest.TestCase):
+    def test_record(self):
+        stats = RequestStats()
+        stats.record("http://example.com/a", 200, 100, 0.5)
+        stats.record("http://example.com/b", 404, 10, 1.5)
+
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual(stats.bytes, 110)
+        self.assertEqual(stats.seconds, 2.0)
+        self.assertEqual(stats.slowest_url, "http://example.com/b")
+        self.assertEqual(stats.status_codes, {200: 1, 404: 1})
+
+
+class TestPooledSession(unittest.TestCase):
+    @responses.activate
+    def test_get(self):
+        responses.add(responses.GET, "http://example.com/a", body='{"a": 1}')
+        session = pooled_session()
+        self.assertEqual(session.get("http://example.com/a").json(), {"a": 1})
+        self.assertEqual(session.stats.requests, 1)
+        self.assertEqual(session.stats.bytes, 8)
@@ -0,0 +1,84 @@
+""" Tests for the metadata one-hot encoding in metadata_encoder.py
+"""
+# coding: utf-8
+
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from metadata_encoder import MetadataEncoder
+
+METADATA_LISTS = {
+    'document_type': ['answer', 'guide', 'news_story'],
+    'primary_publishing_organisation': ['DVLA', 'HMRC'],
+    'publishing_app': ['publisher', 'whitehall']
+}
+
+VARIABLES = ['publishing_app', 'document_type', 'primary_publishing_organisation']
+
+
+class TestMetadataEncoder(object):
+
+    def setup_method(self):
+        self.encoder = MetadataEncoder(METADATA_LISTS, VARIABLES)
+        self.content = pd.DataFrame({
+            'content_id': ['a', 'b', 'c', 'a'],
+            'document_type': ['guide', 'answer', 'news_story', 'answer'],
+            'primary_publishing_organisation': ['HMRC', np.nan, 'DVLA', 'DVLA'],
+            'publishing_app': ['publisher', 'whitehall', 'publisher', 'whitehall']
+        }, dtype=object)
+
+
+    def test_blocks_are_in_a_fixed_order(self):
+        assert self.encoder.variables == ['document_type', 'primary_publishing_organisation', 'publishing_app']
+        assert self.encoder.width == 3 + 3 + 2
+
+
+    def test_transform(self):
+        meta = self.encoder.transform(self.content)
+
+        assert meta.format == 'csr'
+        assert meta.dtype == 'float64'
+        # Columns: answer, guide, news_story, '', DVLA, HMRC, publisher, whitehall
+        assert meta.toarray().tolist() == [
+            [0, 1, 0, 0, 0, 1, 1, 0],
+            [1, 0, 0, 1, 0, 0, 0, 1],
+            [0, 0, 1, 0, 1, 0, 1, 0],
+            [1, 0, 0, 0, 1, 0, 0, 1],
+        ]
+
+
+    def test_transform_content_uses_the_last_row_for_each_content_id(self):
+        meta = self.encoder.transform_content(pd.Index(['c', 'a', 'a']), self.content)
+
+        assert meta.toarray().tolist() == [
+            [0, 0, 1, 0, 1, 0, 1, 0],
+            [1, 0, 0, 0, 1, 0, 0, 1],
+            [1, 0, 0, 0, 1, 0, 0, 1],
+        ]
+
+
+    def test_transform_rejects_unknown_values(self):
+        self.content.loc[1, 'document_type'] = 'travel_advice'
+
+        with pytest.raises(ValueError):
+            self.encoder.transform(self.content)
+
+
+    def test_fitted_from_file_and_pickled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            lists_filename = os.path.join(directory, 'metadata_lists.yaml')
+            with open(lists_filename, 'w') as f:
+                yaml.dump(METADATA_LISTS, f)
+
+            encoder_filename = os.path.join(directory, 'metadata_encoder.pickle')
+            MetadataEncoder.from_file(lists_filename, VARIABLES).save(encoder_filename)
+            encoder = MetadataEncoder.load(encoder_filename)
+
+        assert (encoder.transform(self.content) != self.encoder.transform(self.content)).nnz == 0
+        assert pickle.loads(pickle.dumps(encoder)).classes == self.encoder.classes
@@ -2,6 +2,7 @@
 """
 # coding: utf-8
 
+import json
 import logging
 import os
 import pandas as pd
@@ -38,3 +39,77 @@ class TestPipelineFunctions(object):
                 'test data', self.TEST_PATH, self.logger)
 
         assert os.path.exists(self.TEST_PATH)
+
+
+# details from content items, and the text that get_text extracted from
+# them when it round-tripped them through JSON
+GET_TEXT_CORPUS = [
+    ({},
+     ''),
+    ({'body': '<p>Apply for a <a href="/passport">passport</a>, online.</p>'},
+     'apply for a passport online.'),
+    ({'body': 'x', 'summary': '<p>Short summary</p>', 'change_history': [{'note': 'First published'}]},
+     'short summary'),
+    ({'introduction': 'Self-employed - working for yourself', 'need_to_know': '<ul><li>Need, to know</li></ul>'},
+     'self employed working for yourself need to know'),
+    ({'parts': [{'title': 'Overview', 'slug': 'overview', 'body': '<p>Part one</p>'}, {'title': 'Eligibility', 'slug': 'eligibility', 'body': '<p>Who can apply</p>'}]},
+     'part one who can apply'),
+    ({'parts': [{'title': 'One', 'body': 'x'}]},
+     ''),
+    ({'headers': [{'text': 'Heading', 'level': 2, 'id': 'heading'}]},
+     ''),
+    ({'documents': ['<section><h3>Document</h3><p>Attachment, 1</p></section>', 'Not HTML']},
+     'document attachment 1'),
+    ({'collection_groups': [{'title': 'Group', 'body': '<p>Group body</p>', 'documents': ['a']}]},
+     'group body'),
+    ({'metadata': [{'child_sections': [{'title': 'Child one', 'description': 'First'}, {'title': 'Child two', 'description': 'Second'}]}]},
+     'Child one First Child two Second'),
+    ({'government': {'title': '2015 Conservative government', 'current': True}},
+     ''),
+    ({'body': '<p>Body</p>', 'brand': 'department-for-education', 'logo': {'formatted_title': 'Logo'}, 'unknown': '<p>Ignored</p>'},
+     'body department for education'),
+    ({'ways_to_respond': [], 'will_continue_on': '<p>Continue</p>', 'what_you_need_to_know': 'Plain text'},
+     'plain text continue'),
+    ({'licence_overview': '<p>Overview &amp; details</p>', 'licence_short_description': 'Short-description'},
+     'overview & details short description'),
+    ({'final_outcome_detail': '<div>Outcome</div>', 'final_outcome_documents': ['<div>Outcome document</div>']},
+     'outcome'),
+    ({'more_information': '<p>More</p>', 'other_ways_to_apply': '<p>Other ways</p>', 'introductory_paragraph': '<p>Intro</p>'},
+     'intro more other ways'),
+]
+
+
+class TestGetText(object):
+
+    def test_get_text(self):
+        for details, expected in GET_TEXT_CORPUS:
+            assert pipeline_functions.get_text(details) == expected
+
+    def test_get_text_does_not_modify_details(self):
+        for details, _ in GET_TEXT_CORPUS:
+            copy = json.loads(json.dumps(details))
+            pipeline_functions.get_text(details)
+            assert details == copy
+
+    def test_nested_extract(self):
+        assert pipeline_functions.nested_extract({'title': 'Part title', 'body': '<p>Part body</p>'}) == ' part title part body'
+        assert pipeline_functions.nested_extract({'title': 'Title', 'body': 'x'}) == ''
+        assert pipeline_functions.nested_extract({'child_sections': [{'title': 'A', 'description': 'B'}]}) == ' A B'
+        assert pipeline_functions.nested_extract({'title': 'No body'}) == ''
+
+    def test_is_json(self):
+        assert pipeline_functions.is_json({'title': 'Title'})
+        assert pipeline_functions.is_json([])
+        assert pipeline_functions.is_json([{'a': 1}, {'b': 2}])
+        assert not pipeline_functions.is_json([{'title': 'Title'}, 'text'])
+        assert not pipeline_functions.is_json(['text'])
+        assert not pipeline_functions.is_json('<p>text</p>')
+
+    def test_classify(self):
+        assert pipeline_functions.classify({'body': '<p>Body</p>'}) == ('json', None)
+        assert pipeline_functions.classify('Plain text') == ('text', None)
+        assert pipeline_functions.classify('<p>Single element</p>') == ('text', None)
+
+        kind, tree = pipeline_functions.classify('<p>Some <b>bold</b> text</p>')
+        assert kind == 'html'
+        assert pipeline_functions.html_text.tree_text(tree) == 'some bold text'
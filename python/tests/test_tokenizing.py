@@ -0,0 +1,204 @@
+""" Tests for the tokenizer fitting in tokenizing.py
+"""
+# coding: utf-8
+
+import json
+import os
+import tempfile
+
+import tokenizing
+
+# Texts, and what fitting Keras' Tokenizer(oov_token='UNK', num_words=4)
+# on them gives, before the vocabulary is cut down
+TEXTS = ['The cat, the hat.', 'A hat!\tA\rcat', 'Dog-days', '']
+
+WORD_COUNTS = [('the', 2), ('cat', 1), ('hat', 2), ('a', 1), ('a\rcat', 1), ('dog', 1), ('days', 1)]
+WORD_DOCS = {'hat': 2, 'cat': 1, 'the': 1, 'a\rcat': 1, 'a': 1, 'dog': 1, 'days': 1}
+INDEX_DOCS = {2: 2, 3: 1, 1: 1, 5: 1, 4: 1, 6: 1, 7: 1}
+
+
+class TestTokenizing(object):
+
+    def test_text_to_word_sequence(self):
+        assert tokenizing.text_to_word_sequence('A hat!\tA\rcat') == ['a', 'hat', 'a\rcat']
+        assert tokenizing.text_to_word_sequence(' ,. ') == []
+
+
+    def test_statistics_are_counted_per_text(self):
+        statistics = tokenizing.TokenizerStatistics()
+        for text in TEXTS:
+            statistics.add(text)
+
+        assert list(statistics.word_counts.items()) == WORD_COUNTS
+        assert dict(statistics.word_docs) == WORD_DOCS
+        assert statistics.document_count == 4
+
+
+    def test_word_index_keeps_ties_in_first_seen_order(self):
+        statistics = tokenizing.TokenizerStatistics().add_all(TEXTS)
+
+        assert list(statistics.word_index().items()) == [
+            ('the', 1), ('hat', 2), ('cat', 3), ('a', 4), ('a\rcat', 5), ('dog', 6), ('days', 7)
+        ]
+
+
+    def test_merged_statistics_keep_the_first_seen_order(self):
+        statistics = tokenizing.TokenizerStatistics().add_all(TEXTS[:2])
+        statistics.merge(tokenizing.TokenizerStatistics().add_all(TEXTS[2:]))
+
+        assert list(statistics.word_counts.items()) == WORD_COUNTS
+        assert dict(statistics.word_docs) == WORD_DOCS
+        assert statistics.document_count == 4
+
+
+    def test_fit_tokenizer_statistics_in_chunks(self):
+        for workers in (1, 2):
+            statistics = tokenizing.fit_tokenizer_statistics(TEXTS, workers=workers, chunk_size=1)
+
+            assert list(statistics.word_counts.items()) == WORD_COUNTS
+            assert dict(statistics.word_docs) == WORD_DOCS
+            assert statistics.document_count == 4
+
+
+    def test_create_and_save_tokenizer(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'tokenizer.json')
+            tokenizing.create_and_save_tokenizer(iter(TEXTS), 3, filename)
+
+            with open(filename) as infile:
+                tokenizer_data = json.load(infile)
+
+        assert tokenizer_data == {
+            'word_counts': [list(word_count) for word_count in WORD_COUNTS],
+            'word_docs': WORD_DOCS,
+            'word_index': {'the': 1, 'hat': 2, 'cat': 3, 'UNK': 4},
+            'document_count': 4,
+            'index_docs': {str(index): count for index, count in INDEX_DOCS.items()}
+        }
+
+
+class TestSequenceEncoder(object):
+
+    def setup_method(self):
+        # Indices of num_words or more, here 'a' and 'UNK', are left out
+        self.encoder = tokenizing.SequenceEncoder(
+            {'the': 1, 'hat': 2, 'cat': 3, 'a': 4, 'UNK': 5},
+            num_words=4,
+            maxlen=4
+        )
+        self.texts = ['The cat, the hat.', 'A dog in a hat', '', 'cat ' * 5]
+        self.expected = [[1, 3, 1, 2], [2, 0, 0, 0], [0, 0, 0, 0], [3, 3, 3, 3]]
+
+
+    def test_encode_pads_and_truncates_at_the_end(self):
+        sequences = self.encoder.encode(self.texts)
+
+        assert sequences.dtype == 'int32'
+        assert sequences.tolist() == self.expected
+
+
+    def test_encode_in_chunks(self):
+        assert self.encoder.encode(self.texts, chunk_size=3).tolist() == self.expected
+
+
+    def test_encode_looks_past_unknown_words(self):
+        encoder = tokenizing.SequenceEncoder({'cat': 1}, maxlen=2)
+
+        sequences = encoder.encode(['dog ' * 10 + 'cat', 'cat dog ' * 3])
+
+        assert sequences.tolist() == [[1, 0], [1, 1]]
+
+
+    def test_encode_on_processes(self):
+        sequences = self.encoder.encode(self.texts, chunk_size=1, workers=2)
+
+        assert sequences.tolist() == self.expected
+
+
+class TestVocabulary(object):
+
+    def setup_method(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.tokenizer_filename = os.path.join(self.directory.name, 'tokenizer.json')
+        self.word_index = {'the': 1, 'hat': 2, 'café': 3, 'a\rcat': 4, 'UNK': 5}
+
+
+    def teardown_method(self):
+        self.directory.cleanup()
+
+
+    def test_save_and_read_vocabulary(self):
+        filename = tokenizing.vocabulary_filename(self.tokenizer_filename)
+        tokenizing.save_vocabulary(self.word_index, filename)
+
+        vocabulary = tokenizing.Vocabulary(filename)
+
+        assert len(vocabulary) == 5
+        assert vocabulary.to_dict() == self.word_index
+        assert vocabulary['café'] == 3
+        assert vocabulary.get('dog') is None
+        assert 'a\rcat' in vocabulary
+        assert 'a' not in vocabulary
+
+
+    def test_load_word_index_prefers_the_vocabulary_file(self):
+        tokenizing.TokenizerStatistics().add_all(TEXTS).save(
+            3, self.tokenizer_filename, tokenizing.vocabulary_filename(self.tokenizer_filename)
+        )
+
+        word_index = tokenizing.load_word_index(self.tokenizer_filename)
+
+        assert isinstance(word_index, tokenizing.Vocabulary)
+        assert word_index.to_dict() == {'the': 1, 'hat': 2, 'cat': 3, 'UNK': 4}
+
+
+    def test_load_word_index_ignores_an_older_vocabulary_file(self):
+        filename = tokenizing.vocabulary_filename(self.tokenizer_filename)
+        tokenizing.save_vocabulary(self.word_index, filename)
+        tokenizing.create_and_save_tokenizer(TEXTS, 3, self.tokenizer_filename)
+        os.utime(filename, (0, 0))
+
+        word_index = tokenizing.load_word_index(self.tokenizer_filename)
+
+        assert word_index == {'the': 1, 'hat': 2, 'cat': 3, 'UNK': 4}
+
+
+    def test_load_word_index_without_a_vocabulary_file(self):
+        tokenizing.create_and_save_tokenizer(TEXTS, 3, self.tokenizer_filename)
+
+        word_index = tokenizing.load_word_index(self.tokenizer_filename)
+
+        assert word_index == {'the': 1, 'hat': 2, 'cat': 3, 'UNK': 4}
+
+
+class TestBinaryMatrixEncoder(object):
+
+    def setup_method(self):
+        self.word_index = {'the': 1, 'hat': 2, 'cat': 3, 'a': 4, 'UNK': 5}
+        self.texts = ['The cat, the hat.', 'A dog in a hat', '', 'cat ' * 5]
+        self.expected = [[0, 1, 1, 1], [0, 0, 1, 0], [0, 0, 0, 0], [0, 0, 0, 1]]
+
+
+    def test_encode_one_hot_matrix(self):
+        matrix = tokenizing.BinaryMatrixEncoder(self.word_index, num_words=4).encode(self.texts)
+
+        assert matrix.format == 'csr'
+        assert matrix.dtype == 'float64'
+        assert matrix.has_sorted_indices
+        assert matrix.toarray().tolist() == self.expected
+
+
+    def test_encode_in_chunks_with_a_dtype(self):
+        encoder = tokenizing.BinaryMatrixEncoder(self.word_index, num_words=4, dtype='uint8')
+
+        matrix = encoder.encode(self.texts, chunk_size=3)
+
+        assert matrix.dtype == 'uint8'
+        assert matrix.toarray().tolist() == self.expected
+
+
+    def test_encode_without_num_words(self):
+        matrix = tokenizing.BinaryMatrixEncoder(self.word_index).encode(['a UNK'])
+
+        assert matrix.shape == (1, 6)
+        assert matrix.toarray().tolist() == [[0, 0, 0, 0, 1, 0]]
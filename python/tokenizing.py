@@ -1,31 +1,416 @@
 # coding: utf-8
 
-from keras.preprocessing.text import Tokenizer
-
 import json
+import mmap
+import os
+import re
+import struct
 from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat
+
+import numpy as np
+from scipy import sparse
+
+from lib.concurrency import imap_ordered
+
+# The tokenizers are fitted the same way as a Keras Tokenizer, with
+# its default filters, but without holding the texts: each text is
+# split into words as it's added, and only the counts are kept. The
+# files written are the same as those from fitting Keras'
+# Tokenizer(oov_token='UNK', num_words=num_words+1) on all the texts.
+#
+# Next to each tokenizer file there can be a vocabulary file, with
+# just its word_index, which is all that's needed to encode texts. It
+# can be read without parsing the rest of the tokenizer, see
+# Vocabulary.
+
+OOV_TOKEN = 'UNK'
+
+FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+
+__filter_table = str.maketrans(FILTERS, ' ' * len(FILTERS))
+
+
+def filter_text(text):
+    # Lower cases text, and replaces the filtered characters with the
+    # spaces that separate words
+    return text.lower().translate(__filter_table)
+
+
+def text_to_word_sequence(text):
+    # The same as keras.preprocessing.text.text_to_word_sequence with
+    # the default arguments. Only spaces split words, so other
+    # whitespace, e.g. '\r', is kept.
+    return [word for word in filter_text(text).split(' ') if word]
+
+
+class TokenizerStatistics():
+    def __init__(self):
+        # word_counts is in the order words were first seen, which
+        # decides the order of words with the same count
+        self.word_counts = OrderedDict()
+        self.word_docs = OrderedDict()
+        self.document_count = 0
+
+    def add(self, text):
+        word_counts = self.word_counts
+        word_docs = self.word_docs
+        words = text_to_word_sequence(text)
+
+        self.document_count += 1
+
+        for word in words:
+            word_counts[word] = word_counts.get(word, 0) + 1
+
+        for word in set(words):
+            word_docs[word] = word_docs.get(word, 0) + 1
+
+    def add_all(self, texts):
+        for text in texts:
+            self.add(text)
+        return self
+
+    def merge(self, other):
+        # Adds the counts of texts that came after those already
+        # added. Merging the statistics of consecutive chunks of texts,
+        # in order, gives the same word order as adding all the texts.
+        word_counts = self.word_counts
+        word_docs = self.word_docs
+
+        for word, count in other.word_counts.items():
+            word_counts[word] = word_counts.get(word, 0) + count
+
+        for word, count in other.word_docs.items():
+            word_docs[word] = word_docs.get(word, 0) + count
+
+        self.document_count += other.document_count
+        return self
+
+    def word_index(self):
+        # Most frequent first, from 1. The sort is stable, so ties
+        # keep their first seen order, as in Keras.
+        sorted_words = sorted(self.word_counts, key=self.word_counts.__getitem__, reverse=True)
+        return OrderedDict(zip(sorted_words, range(1, len(sorted_words) + 1)))
+
+    def tokenizer_dict(self, num_words):
+        word_index = self.word_index()
+        index_docs = OrderedDict((word_index[word], count) for word, count in self.word_docs.items())
+
+        # The vocabulary is cut down to the num_words most frequent
+        # words, and anything else is the out of vocabulary token
+        word_index = OrderedDict((word, index) for word, index in word_index.items() if index <= num_words)
+        word_index[OOV_TOKEN] = num_words + 1
+
+        return {
+            "word_counts": list(self.word_counts.items()),
+            "word_docs": self.word_docs,
+            "word_index": word_index,
+            "document_count": self.document_count,
+            "index_docs": index_docs
+        }
+
+    def save(self, num_words, outfilename, vocabulary_outfilename=None):
+        tokenizer_dict = self.tokenizer_dict(num_words)
+
+        with open(outfilename, 'w') as outfile:
+            json.dump(tokenizer_dict, outfile)
+
+        if vocabulary_outfilename:
+            save_vocabulary(tokenizer_dict['word_index'], vocabulary_outfilename)
+
+
+class Vocabulary(Mapping):
+    # A word_index, read from a file written by save_vocabulary. The
+    # file is memory mapped, and individual words are found with a
+    # binary search, so nothing is read until it's needed.
+    #
+    # The file has a header, then the indices of the words, as int32s,
+    # the offsets of the words in the string table, as uint32s, and the
+    # string table: the words, sorted, encoded as UTF-8 and
+    # concatenated. All numbers are little endian.
+    MAGIC = b'TOKV'
+    VERSION = 1
+    HEADER = struct.Struct('<4sIII')
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as infile:
+            self.buffer = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, strings_size = self.HEADER.unpack_from(self.buffer)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("{} isn't a version {} vocabulary file".format(filename, self.VERSION))
+
+        self.count = count
+        self.indices = np.frombuffer(self.buffer, dtype='<i4', count=count, offset=self.HEADER.size)
+        self.offsets = np.frombuffer(self.buffer, dtype='<u4', count=count + 1, offset=self.HEADER.size + 4 * count)
+        self.strings_start = self.HEADER.size + 8 * count + 4
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.words())
+
+    def __contains__(self, word):
+        return self.__position(word) is not None
+
+    def __getitem__(self, word):
+        position = self.__position(word)
+        if position is None:
+            raise KeyError(word)
+        return int(self.indices[position])
+
+    def words(self):
+        strings = self.buffer[self.strings_start:self.strings_start + int(self.offsets[-1])]
+        offsets = self.offsets.tolist()
+        return [strings[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+    def items(self):
+        return zip(self.words(), self.indices.tolist())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __word_bytes(self, position):
+        start = self.strings_start + int(self.offsets[position])
+        end = self.strings_start + int(self.offsets[position + 1])
+        return self.buffer[start:end]
+
+    def __position(self, word):
+        key = word.encode('utf-8')
+        low, high = 0, self.count
+
+        while low < high:
+            middle = (low + high) // 2
+            if self.__word_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.count and self.__word_bytes(low) == key:
+            return low
+        return None
 
 
-def create_and_save_tokenizer(data, num_words, outfilename):
-    tokenizer = Tokenizer(oov_token='UNK', num_words=num_words+1)
-    tokenizer.fit_on_texts(data)
-    tokenizer.word_index = {e: i for e, i in tokenizer.word_index.items() if i <= num_words}
-    tokenizer.word_index[tokenizer.oov_token] = num_words + 1
+def vocabulary_filename(tokenizer_filename):
+    return re.sub(r'\.json$', '', tokenizer_filename) + '.vocab'
 
-    tokenizer_dict = {
-        "word_counts": list(tokenizer.word_counts.items()),
-        "word_docs": tokenizer.word_docs,
-        "word_index": tokenizer.word_index,
-        "document_count": tokenizer.document_count,
-        "index_docs": tokenizer.index_docs
-    }
 
-    with open(outfilename, 'w') as outfile:
-        json.dump(tokenizer_dict, outfile)
+def save_vocabulary(word_index, filename):
+    # UTF-8 sorts in the same order as the code points of the words,
+    # so the string table is sorted for a byte-wise binary search
+    words = sorted(word_index)
+    encoded_words = [word.encode('utf-8') for word in words]
+
+    offsets = np.zeros(len(words) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(encoded_word) for encoded_word in encoded_words])
+    indices = np.array([word_index[word] for word in words], dtype='<i4')
+
+    with open(filename, 'wb') as outfile:
+        outfile.write(Vocabulary.HEADER.pack(Vocabulary.MAGIC, Vocabulary.VERSION, len(words), int(offsets[-1])))
+        outfile.write(indices.tobytes())
+        outfile.write(offsets.tobytes())
+        outfile.write(b''.join(encoded_words))
+
+
+def known_word_indices(word_index, word_lists, rows):
+    # Looks up every word in word_lists at once, returning the indices
+    # of those in word_index, in order, and the row each is from.
+    # Words are left out with a 0, which is never an index, and so are
+    # the empty strings between separators.
+    counts = np.fromiter(map(len, word_lists), dtype=np.int64, count=len(word_lists))
+    words = list(chain.from_iterable(word_lists))
+
+    indices = np.fromiter(map(word_index.get, words, repeat(0)), dtype=np.int64, count=len(words))
+    word_rows = np.repeat(rows, counts)
+
+    known = indices != 0
+    return indices[known], word_rows[known]
+
+
+class SequenceEncoder():
+    # Converts texts to a padded array of word indices, the same as
+    # calling texts_to_sequences on a tokenizer loaded with
+    # load_tokenizer_from_file, with its num_words set, and then
+    # pad_sequences with padding and truncating 'post'.
+    #
+    # Words that aren't in the vocabulary, or whose index is num_words
+    # or more, are left out. Those tokenizers have no out of
+    # vocabulary token.
+    def __init__(self, word_index, num_words=None, maxlen=1000, dtype='int32'):
+        self.word_index = {
+            word: index for word, index in word_index.items()
+            if not num_words or index < num_words
+        }
+        self.maxlen = maxlen
+        self.dtype = dtype
+
+    def encode(self, texts, chunk_size=10000, workers=1):
+        # Encodes chunk_size texts at a time into a preallocated array.
+        # With more than one worker, the chunks are encoded on a pool
+        # of processes.
+        sequences = np.zeros((len(texts), self.maxlen), dtype=self.dtype)
+        iterator = iter(texts)
+        chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+
+        if workers > 1:
+            encoded_chunks = imap_ordered(
+                self.encode_chunk,
+                chunks,
+                concurrency=workers,
+                executor_class=ProcessPoolExecutor
+            )
+        else:
+            encoded_chunks = map(self.encode_chunk, chunks)
+
+        start = 0
+        for encoded_chunk in encoded_chunks:
+            sequences[start:start + len(encoded_chunk)] = encoded_chunk
+            start += len(encoded_chunk)
+
+        return sequences
+
+    def encode_chunk(self, texts):
+        sequences = np.zeros((len(texts), self.maxlen), dtype=self.dtype)
+
+        # Only the first maxlen known words of each text are kept, so
+        # the words are looked up lookahead at a time, and the rest of
+        # a text is only split and looked up if it's still short
+        lookahead = self.maxlen
+        rows = np.arange(len(texts))
+        lengths = np.zeros(len(texts), dtype=np.int64)
+        remainders = [filter_text(text) for text in texts]
+
+        while len(rows):
+            word_lists = [remainder.split(' ', lookahead) for remainder in remainders]
+            remainders = [
+                word_list.pop() if len(word_list) > lookahead else ''
+                for word_list in word_lists
+            ]
+
+            self.__fill(sequences, lengths, rows, word_lists)
+
+            unfinished = [
+                i for i, (row, remainder) in enumerate(zip(rows, remainders))
+                if remainder and lengths[row] < self.maxlen
+            ]
+            rows = rows[unfinished]
+            remainders = [remainders[i] for i in unfinished]
+
+        return sequences
+
+    def __fill(self, sequences, lengths, rows, word_lists):
+        # Appends the indices of the known words in word_lists to the
+        # sequences in rows, which already have lengths indices
+        indices, word_rows = known_word_indices(self.word_index, word_lists, rows)
+
+        # The position of each index in its sequence, truncated to maxlen
+        known_counts = np.bincount(word_rows, minlength=len(sequences))
+        starts = np.cumsum(known_counts) - known_counts
+        columns = np.arange(len(indices)) - starts[word_rows] + lengths[word_rows]
+        kept = columns < self.maxlen
+
+        sequences[word_rows[kept], columns[kept]] = indices[kept]
+        lengths += known_counts
+
+
+class BinaryMatrixEncoder():
+    # Converts texts to a sparse matrix, with a 1 in column i of a row
+    # if its text has the word with index i. This is the same as
+    # csr_matrix(tokenizer.texts_to_matrix(texts, mode='binary')), for
+    # a tokenizer loaded with load_tokenizer_from_file with its
+    # num_words set, but without the dense matrix. The width of the
+    # matrix is num_words, and column 0 is never set.
+    def __init__(self, word_index, num_words=None, dtype='float64'):
+        self.num_words = num_words or len(word_index) + 1
+        self.word_index = {
+            word: index for word, index in word_index.items()
+            if index < self.num_words
+        }
+        self.dtype = dtype
+
+    def encode(self, texts, chunk_size=10000):
+        # The matrix is built chunk_size texts at a time, so only the
+        # column indices of the ones are kept for the texts done so far
+        iterator = iter(texts)
+        chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+
+        columns = []
+        row_lengths = []
+        for chunk in chunks:
+            chunk_columns, chunk_row_lengths = self.encode_chunk(chunk)
+            columns.append(chunk_columns)
+            row_lengths.append(chunk_row_lengths)
+
+        row_lengths = np.concatenate(row_lengths) if row_lengths else np.zeros(0, dtype=np.int64)
+        indptr = np.zeros(len(row_lengths) + 1, dtype=np.int64)
+        np.cumsum(row_lengths, out=indptr[1:])
+        indices = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int32)
+
+        return sparse.csr_matrix(
+            (np.ones(len(indices), dtype=self.dtype), indices, indptr),
+            shape=(len(row_lengths), self.num_words)
+        )
+
+    def encode_chunk(self, texts):
+        # Returns the columns of the ones in each row, in order, and the
+        # number of ones in each row
+        word_lists = [filter_text(text).split(' ') for text in texts]
+        indices, rows = known_word_indices(self.word_index, word_lists, np.arange(len(word_lists)))
+
+        # Each word once per row, sorted by row then column
+        cells = np.unique(rows * self.num_words + indices)
+        row_lengths = np.bincount(cells // self.num_words, minlength=len(word_lists))
+
+        return (cells % self.num_words).astype(np.int32), row_lengths
+
+
+def fit_tokenizer_statistics(texts, workers=1, chunk_size=1000):
+    # With more than one worker, chunks of texts are counted on a pool
+    # of processes, and merged in order
+    iterator = iter(texts)
+    chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+
+    if workers > 1:
+        chunk_statistics = imap_ordered(
+            __chunk_statistics,
+            chunks,
+            concurrency=workers,
+            executor_class=ProcessPoolExecutor
+        )
+    else:
+        chunk_statistics = map(__chunk_statistics, chunks)
+
+    statistics = TokenizerStatistics()
+    for other in chunk_statistics:
+        statistics.merge(other)
+
+    return statistics
+
+
+def create_and_save_tokenizer(data, num_words, outfilename, workers=1):
+    fit_tokenizer_statistics(data, workers=workers).save(num_words, outfilename)
+
+
+def load_word_index(filename):
+    # Uses the vocabulary file next to the tokenizer file, if there is
+    # one, rather than parsing the whole tokenizer. A vocabulary file
+    # older than the tokenizer file is from an earlier tokenizer, as
+    # the tokenizer can be saved without one, so is ignored.
+    vocabulary = vocabulary_filename(filename)
+    if os.path.exists(vocabulary) and os.path.getmtime(vocabulary) >= os.path.getmtime(filename):
+        return Vocabulary(vocabulary)
+
+    with open(filename, 'r') as infile:
+        return json.load(infile)['word_index']
 
 
 def load_tokenizer_from_file(filename):
-    
+    # Keras is only needed to use a tokenizer, not to fit one
+    from keras.preprocessing.text import Tokenizer
+
     tokenizer = Tokenizer()
 
     with open(filename, 'r') as infile:
@@ -38,3 +423,8 @@ def load_tokenizer_from_file(filename):
     tokenizer.index_docs = tokenizer_data['index_docs']
 
     return tokenizer
+
+# PRIVATE
+
+def __chunk_statistics(texts):
+    return TokenizerStatistics().add_all(texts)